@@ -27,7 +27,7 @@ echo "  ✓ 04_timing_distributions.png"
 echo "  ✓ 05_layer_statistics.png"
 echo "  ✓ 06_scenario_comparison_dashboard.png (MAIN PLOT)"
 echo "  ✓ 07_summary_statistics.png"
-echo "  ✓ summary_statistics.csv"
+echo "  ✓ summary_statistics.parquet (add --csv for a CSV copy)"
 echo ""
 echo "📖 Documentation:"
 echo "  • SIMULATION_RUNNER_README.md  - How to run simulations"
@@ -6,7 +6,7 @@ Analyzes simulation results from the simulation runner and generates comprehensi
 graphs and plots for performance analysis.
 
 Usage:
-    python analyze_simulation.py simulated_results/simulation_YYYYMMDD_HHMMSS
+    python analyze_simulation.py simulated_results/simulation_YYYYMMDD_HHMMSS [--csv] [--engine polars] [--no-summary-png]
 
 The script generates:
 - Device vs Edge execution time comparison
@@ -16,15 +16,29 @@ The script generates:
 - Per-layer execution statistics
 - Multi-client performance comparison
 - Network/computation delay impact analysis
+
+Summary tables are written as Parquet (zstd, dictionary-encoded scenario
+column) when pyarrow is installed; pass --csv to also write CSV copies and
+--no-summary-png to skip rendering the summary table image.
+With --engine polars the CSVs are scanned and aggregated by one lazy Polars
+query instead of pandas. The plots are rendered in parallel worker processes.
 """
 
 import sys
+import gc
+import argparse
 import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Dict, List, Tuple
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # Headless backend: plots are only written to files
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
+from matplotlib.colors import to_rgba_array
 from datetime import datetime
 
 # Try to import seaborn for better styling
@@ -35,14 +49,68 @@ try:
 except ImportError:
     SEABORN_AVAILABLE = False
 
+# Try to import pyarrow for multithreaded columnar CSV parsing
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as pads
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Try to import orjson for faster config parsing
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Try to import polars for the optional lazy analysis engine
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
+
+# Only these result columns are used by the analysis, read as float32 to halve
+# memory compared to the inferred float64. Layer counts stay float too: an
+# empty cell becomes NaN instead of failing an integer column
+RESULT_DTYPES = {
+    'avg_device_time': 'float32',
+    'avg_edge_time': 'float32',
+    'min_device_time': 'float32',
+    'max_device_time': 'float32',
+    'num_device_layers': 'float32',
+    'num_edge_layers': 'float32',
+}
+
+
+def _render_plot(analyzer, plot_name):
+    """Run one plot method of analyzer (a SimulationAnalyzer._plot_state).
+    
+    Module-level so it can run in a worker process; with the Agg backend each
+    process renders its own figures independently.
+    """
+    getattr(analyzer, plot_name)()
+    return plot_name
+
 
 class SimulationAnalyzer:
-    def __init__(self, results_dir: Path):
+    def __init__(self, results_dir: Path, write_csv: bool = False, engine: str = 'pandas',
+                 summary_png: bool = True):
         """Initialize analyzer with results directory"""
         self.results_dir = Path(results_dir)
         if not self.results_dir.exists():
             raise ValueError(f"Results directory not found: {results_dir}")
-        
+        if engine not in ('pandas', 'polars'):
+            raise ValueError(f"Unknown analysis engine: {engine}")
+        if engine == 'polars' and not POLARS_AVAILABLE:
+            raise ValueError("The polars engine requires polars to be installed")
+        
+        self.write_csv = write_csv
+        self.engine = engine
+        self.summary_png = summary_png
         self.data = {}  # scenario_name -> DataFrame
         self.configs = {}  # scenario_name -> config dict
         self.output_dir = self.results_dir / "analysis"
@@ -53,68 +121,263 @@ class SimulationAnalyzer:
     
     def _load_data(self):
         """Load all CSV files and configs from results directory"""
-        csv_files = list(self.results_dir.glob("*_inference_results.csv"))
+        csv_files = sorted(self.results_dir.glob("*_inference_results.csv"))
         
         if not csv_files:
             raise ValueError(f"No inference results CSV files found in {self.results_dir}")
         
         print(f"\n📁 Found {len(csv_files)} scenario results")
         
-        for csv_file in sorted(csv_files):
+        if self.engine == 'polars':
+            self._load_data_polars(csv_files)
+            return
+        
+        for csv_file, read_csv in self._csv_readers(csv_files):
             scenario_name = csv_file.stem.replace("_inference_results", "")
             
             # Load CSV
             try:
-                df = pd.read_csv(csv_file)
+                df = read_csv()
                 self.data[scenario_name] = df
                 print(f"  ✓ {scenario_name}: {len(df)} inferences")
             except Exception as e:
                 print(f"  ✗ Error loading {scenario_name}: {e}")
                 continue
-            
-            # Load config
-            config_file = self.results_dir / f"{scenario_name}_scenario_config.json"
-            if config_file.exists():
-                try:
-                    with open(config_file, 'r') as f:
-                        self.configs[scenario_name] = json.load(f)
-                except Exception as e:
-                    print(f"  ⚠ Error loading config for {scenario_name}: {e}")
+        
+        self._load_configs()
+        self._build_stats()
+    
+    def _load_configs(self):
+        """Load the config JSON of every loaded scenario, reading the files concurrently"""
+        config_files = {
+            name: self.results_dir / f"{name}_scenario_config.json" for name in self.data
+        }
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            pending = {
+                name: executor.submit(config_file.read_bytes)
+                for name, config_file in config_files.items() if config_file.exists()
+            }
+        
+        for scenario_name, future in pending.items():
+            try:
+                self.configs[scenario_name] = json_loads(future.result())
+            except Exception as e:
+                print(f"  ⚠ Error loading config for {scenario_name}: {e}")
+    
+    def _load_data_polars(self, csv_files):
+        """Scan all CSVs and aggregate every per-scenario statistic in one lazy Polars query"""
+        lf = (
+            pl.scan_csv(
+                [str(f) for f in csv_files],
+                include_file_paths='scenario_path',
+                schema_overrides={col: getattr(pl, dtype.capitalize()) for col, dtype in RESULT_DTYPES.items()},
+            )
+            .select(*RESULT_DTYPES, 'scenario_path')
+            .with_columns(
+                pl.col('scenario_path').str.extract(r'([^/\\]+)_inference_results\.csv$').alias('scenario'),
+                (pl.col('avg_device_time') + pl.col('avg_edge_time')).alias('total_time'),
+            )
+            .drop('scenario_path')
+        )
+        long = lf.collect()
+        
+        stats = long.lazy().group_by('scenario').agg(
+            pl.col('avg_device_time').mean().alias('dev_mean'),
+            pl.col('avg_device_time').std().alias('dev_std'),
+            pl.col('avg_edge_time').mean().alias('edge_mean'),
+            pl.col('avg_edge_time').std().alias('edge_std'),
+            pl.col('total_time').mean().alias('total_mean'),
+            pl.col('total_time').std().alias('total_std'),
+            pl.col('min_device_time').mean().alias('dev_min'),
+            pl.col('max_device_time').mean().alias('dev_max'),
+            pl.len().alias('n'),
+            pl.col('num_device_layers').mean().alias('dev_layers'),
+            pl.col('num_edge_layers').mean().alias('edge_layers'),
+        ).collect()
+        
+        # Per-scenario frames are still needed for the distribution plots
+        frames = {
+            scenario_name: df.drop('scenario', 'total_time').to_pandas()
+            for (scenario_name,), df in long.partition_by('scenario', as_dict=True, maintain_order=True).items()
+        }
+        # A header-only CSV has no rows to partition: keep it as an empty frame, as the pandas engine does
+        empty = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in RESULT_DTYPES.items()})
+        for csv_file in csv_files:
+            scenario_name = csv_file.stem.replace("_inference_results", "")
+            self.data[scenario_name] = frames.get(scenario_name, empty)
+            print(f"  ✓ {scenario_name}: {len(self.data[scenario_name])} inferences")
+        
+        self._load_configs()
+        self._long = long.to_pandas()
+        self._finish_stats(stats.to_pandas().set_index('scenario'))
+    
+    def _csv_readers(self, csv_files):
+        """Yield (csv_path, reader) pairs, where reader() returns the file as a DataFrame.
+        
+        With pyarrow all files are scanned once, as one Arrow dataset whose CSV reader
+        parses columns in parallel, into self._arrow_table; each reader converts its
+        file's (zero-copy) slice of that table. Otherwise each file goes through pd.read_csv.
+        """
+        if not PYARROW_AVAILABLE:
+            for csv_file in csv_files:
+                yield csv_file, partial(
+                    pd.read_csv, csv_file, usecols=list(RESULT_DTYPES), dtype=RESULT_DTYPES
+                )
+            return
+        
+        csv_format = pads.CsvFileFormat(convert_options=pacsv.ConvertOptions(
+            column_types={col: pa.type_for_alias(dtype) for col, dtype in RESULT_DTYPES.items()},
+        ))
+        dataset = pads.dataset([str(f) for f in csv_files], format=csv_format)
+        # to_table keeps the rows of each file together, in the dataset's file order
+        table = dataset.to_table(columns=[*RESULT_DTYPES, '__filename'])
+        paths, counts = pc.value_counts(table['__filename']).flatten()
+        rows = dict(zip(paths.to_pylist(), counts.to_pylist()))
+        self._arrow_table = table.drop_columns(['__filename'])
+        
+        offset = 0
+        for path in dataset.files:
+            # a header-only file has no rows and gets an empty slice
+            length = rows.get(path, 0)
+            yield Path(path), partial(self._arrow_slice, offset, length)
+            offset += length
+    
+    def _arrow_slice(self, offset, length):
+        """Rows offset to offset + length of the scanned Arrow table, as a DataFrame"""
+        return self._arrow_table.slice(offset, length).to_pandas()
+    
+    def _build_stats(self):
+        """Concatenate all scenarios into one long frame and aggregate per scenario"""
+        self._long = pd.concat(
+            [df.assign(scenario=name) for name, df in self.data.items()],
+            ignore_index=True,
+            copy=False
+        )
+        # Add the raw arrays directly, skipping Series index alignment
+        self._long['total_time'] = np.add(
+            self._long['avg_device_time'].to_numpy(),
+            self._long['avg_edge_time'].to_numpy()
+        )
+        
+        # One groupby pass computes every per-scenario statistic used by the plots
+        stats = self._long.groupby('scenario', sort=True).agg(
+            dev_mean=('avg_device_time', 'mean'),
+            dev_std=('avg_device_time', 'std'),
+            edge_mean=('avg_edge_time', 'mean'),
+            edge_std=('avg_edge_time', 'std'),
+            total_mean=('total_time', 'mean'),
+            total_std=('total_time', 'std'),
+            dev_min=('min_device_time', 'mean'),
+            dev_max=('max_device_time', 'mean'),
+            n=('avg_device_time', 'size'),
+            dev_layers=('num_device_layers', 'mean'),
+            edge_layers=('num_edge_layers', 'mean'),
+        )
+        self._finish_stats(stats)
+    
+    def _finish_stats(self, stats):
+        """Align the aggregated stats with the loaded scenarios and convert them to ms"""
+        # Keep scenarios without inferences, as the per-scenario loops did
+        self._scenarios = tuple(sorted(self.data))
+        self._configs_ordered = [self.configs.get(s, {}) for s in self._scenarios]
+        stats = stats.reindex(self._scenarios)
+        stats['n'] = stats['n'].fillna(0).astype(int)
+        
+        # Convert seconds to milliseconds once on the aggregated frame
+        time_cols = ['dev_mean', 'dev_std', 'edge_mean', 'edge_std',
+                     'total_mean', 'total_std', 'dev_min', 'dev_max']
+        stats[time_cols] *= 1000
+        self._stats = stats
+        
+        # Per-inference times in ms, materialized once for the distribution plots
+        self._dev_ms = {s: df['avg_device_time'].to_numpy() * 1000.0 for s, df in self.data.items()}
+        self._edge_ms = {s: df['avg_edge_time'].to_numpy() * 1000.0 for s, df in self.data.items()}
     
-    def analyze_all(self):
-        """Generate all analysis plots"""
+    # Plot methods run by analyze_all, each writing its own PNG, with the
+    # aggregated data each of them reads (see _plot_state)
+    PLOTS = {
+        'plot_device_vs_edge_time': ('_dev_ms', '_edge_ms'),
+        'plot_total_inference_time': ('_stats',),
+        'plot_throughput_comparison': ('_stats', '_configs_ordered'),
+        'plot_timing_distributions': ('_dev_ms', '_edge_ms'),
+        'plot_layer_statistics': ('_stats',),
+        'plot_scenario_comparison': ('_stats',),
+        'generate_summary_stats': ('_stats', '_configs_ordered'),
+    }
+    # Settings every plot may read
+    PLOT_SETTINGS = ('output_dir', 'write_csv', 'summary_png', '_scenarios')
+    
+    def _plot_state(self, plot_name):
+        """Analyzer carrying only what plot_name reads, to send to a worker process.
+        
+        The raw per-scenario frames, the long frame and the Arrow table stay here.
+        """
+        state = object.__new__(type(self))
+        for attr in self.PLOT_SETTINGS + self.PLOTS[plot_name]:
+            setattr(state, attr, getattr(self, attr))
+        return state
+    
+    def analyze_all(self, max_workers=None):
+        """Generate all analysis plots.
+        
+        The figures (the per-scenario panels and the dashboard among them) are
+        rendered in parallel worker processes; with max_workers=1 they are drawn
+        one after the other in this process.
+        """
         print("\n📈 Generating analysis plots...\n")
         
-        self.plot_device_vs_edge_time()
-        self.plot_total_inference_time()
-        self.plot_throughput_comparison()
-        self.plot_timing_distributions()
-        self.plot_layer_statistics()
-        self.plot_scenario_comparison()
-        self.generate_summary_stats()
+        if max_workers == 1:
+            # A single figure is cleared and resized for every plot so the Agg
+            # canvas is not reallocated between them
+            fig = plt.figure()
+            for plot_name in self.PLOTS:
+                getattr(self, plot_name)(fig=fig)
+                gc.collect()
+            plt.close(fig)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_render_plot, self._plot_state(plot_name), plot_name)
+                           for plot_name in self.PLOTS]
+                for future in futures:
+                    future.result()
         
         print(f"\n✅ Analysis complete! Plots saved to: {self.output_dir}\n")
     
-    def plot_device_vs_edge_time(self):
+    def _prepare_figure(self, fig, figsize):
+        """Return (figure, owned): fig cleared and resized, or a new figure when None"""
+        if fig is None:
+            return plt.figure(figsize=figsize), True
+        fig.clf()
+        fig.set_size_inches(*figsize)
+        return fig, False
+    
+    def _save_figure(self, fig, filename, owned, tight=True):
+        """Save fig to the analysis folder, closing it if it was created by the plot"""
+        if tight:
+            fig.tight_layout()
+        fig.savefig(self.output_dir / filename, dpi=150, bbox_inches='tight')
+        if owned:
+            plt.close(fig)
+    
+    def plot_device_vs_edge_time(self, fig=None):
         """Compare device vs edge execution times"""
-        fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+        fig, owned = self._prepare_figure(fig, (14, 10))
+        axes = fig.subplots(2, 2)
         fig.suptitle("Device vs Edge Execution Time Comparison", fontsize=16, fontweight='bold')
         
-        scenarios = sorted(self.data.keys())
+        scenarios = self._scenarios
         
         for idx, ax in enumerate(axes.flat):
             if idx < len(scenarios):
                 scenario = scenarios[idx]
-                df = self.data[scenario]
-                
-                # Calculate averages per inference
-                device_times = df['avg_device_time'] * 1000  # Convert to ms
-                edge_times = df['avg_edge_time'] * 1000
                 
-                x = range(min(50, len(df)))  # Plot first 50 inferences
+                # Plot first 50 inferences
+                device_times = self._dev_ms[scenario][:50]
+                edge_times = self._edge_ms[scenario][:50]
+                x = range(len(device_times))
                 
-                ax.plot(x, device_times.iloc[:len(x)], label='Device', marker='o', linewidth=2, markersize=4)
-                ax.plot(x, edge_times.iloc[:len(x)], label='Edge', marker='s', linewidth=2, markersize=4)
+                ax.plot(x, device_times, label='Device', marker='o', linewidth=2, markersize=4)
+                ax.plot(x, edge_times, label='Edge', marker='s', linewidth=2, markersize=4)
                 
                 ax.set_xlabel('Inference #')
                 ax.set_ylabel('Time (ms)')
@@ -124,25 +387,17 @@ class SimulationAnalyzer:
             else:
                 ax.set_visible(False)
         
-        plt.tight_layout()
-        plt.savefig(self.output_dir / "01_device_vs_edge_time.png", dpi=150, bbox_inches='tight')
-        plt.close()
+        self._save_figure(fig, "01_device_vs_edge_time.png", owned)
         print("  ✓ Device vs Edge time comparison")
     
-    def plot_total_inference_time(self):
+    def plot_total_inference_time(self, fig=None):
         """Plot total (device + edge) inference time per scenario"""
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        scenarios = []
-        avg_times = []
-        std_times = []
+        fig, owned = self._prepare_figure(fig, (12, 6))
+        ax = fig.subplots()
         
-        for scenario in sorted(self.data.keys()):
-            df = self.data[scenario]
-            total_time = (df['avg_device_time'] + df['avg_edge_time']) * 1000  # ms
-            scenarios.append(scenario)
-            avg_times.append(total_time.mean())
-            std_times.append(total_time.std())
+        scenarios = self._scenarios
+        avg_times = self._stats['total_mean'].to_numpy()
+        std_times = self._stats['total_std'].to_numpy()
         
         x_pos = range(len(scenarios))
         ax.bar(x_pos, avg_times, yerr=std_times, capsize=5, alpha=0.7, color='steelblue')
@@ -157,28 +412,17 @@ class SimulationAnalyzer:
         for i, (mean, std) in enumerate(zip(avg_times, std_times)):
             ax.text(i, mean + std + 1, f'{mean:.1f}ms', ha='center', va='bottom', fontsize=9)
         
-        plt.tight_layout()
-        plt.savefig(self.output_dir / "02_total_inference_time.png", dpi=150, bbox_inches='tight')
-        plt.close()
+        self._save_figure(fig, "02_total_inference_time.png", owned)
         print("  ✓ Total inference time comparison")
     
-    def plot_throughput_comparison(self):
+    def plot_throughput_comparison(self, fig=None):
         """Plot throughput (inferences per second) for each scenario"""
-        fig, ax = plt.subplots(figsize=(12, 6))
+        fig, owned = self._prepare_figure(fig, (12, 6))
+        ax = fig.subplots()
         
-        scenarios = []
-        throughputs = []
-        durations = []
-        
-        for scenario in sorted(self.data.keys()):
-            df = self.data[scenario]
-            config = self.configs.get(scenario, {})
-            duration = config.get('duration_seconds', 30)
-            
-            throughput = len(df) / duration
-            scenarios.append(scenario)
-            throughputs.append(throughput)
-            durations.append(duration)
+        scenarios = self._scenarios
+        durations = [config.get('duration_seconds', 30) for config in self._configs_ordered]
+        throughputs = [n / d for n, d in zip(self._stats['n'], durations)]
         
         colors = ['#2ecc71' if d == 30 else '#e74c3c' if d == 45 else '#3498db' for d in durations]
         x_pos = range(len(scenarios))
@@ -203,19 +447,18 @@ class SimulationAnalyzer:
         ]
         ax.legend(handles=legend_elements, loc='upper right')
         
-        plt.tight_layout()
-        plt.savefig(self.output_dir / "03_throughput_comparison.png", dpi=150, bbox_inches='tight')
-        plt.close()
+        self._save_figure(fig, "03_throughput_comparison.png", owned)
         print("  ✓ Throughput comparison")
     
-    def plot_timing_distributions(self):
+    def plot_timing_distributions(self, fig=None):
         """Create boxplots of timing distributions"""
-        fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+        fig, owned = self._prepare_figure(fig, (14, 6))
+        axes = fig.subplots(1, 2)
         fig.suptitle("Timing Distribution Boxplots", fontsize=16, fontweight='bold')
         
-        scenarios = sorted(self.data.keys())
-        device_times = [self.data[s]['avg_device_time'].values * 1000 for s in scenarios]
-        edge_times = [self.data[s]['avg_edge_time'].values * 1000 for s in scenarios]
+        scenarios = self._scenarios
+        device_times = [self._dev_ms[s] for s in scenarios]
+        edge_times = [self._edge_ms[s] for s in scenarios]
         
         # Device time boxplot
         bp1 = axes[0].boxplot(device_times, labels=scenarios, patch_artist=True)
@@ -235,23 +478,17 @@ class SimulationAnalyzer:
             patch.set_facecolor('#e74c3c')
         axes[1].grid(True, alpha=0.3, axis='y')
         
-        plt.tight_layout()
-        plt.savefig(self.output_dir / "04_timing_distributions.png", dpi=150, bbox_inches='tight')
-        plt.close()
+        self._save_figure(fig, "04_timing_distributions.png", owned)
         print("  ✓ Timing distribution boxplots")
     
-    def plot_layer_statistics(self):
+    def plot_layer_statistics(self, fig=None):
         """Plot number of layers executed on device vs edge"""
-        fig, ax = plt.subplots(figsize=(12, 6))
+        fig, owned = self._prepare_figure(fig, (12, 6))
+        ax = fig.subplots()
         
-        scenarios = sorted(self.data.keys())
-        device_layers = []
-        edge_layers = []
-        
-        for scenario in scenarios:
-            df = self.data[scenario]
-            device_layers.append(df['num_device_layers'].mean())
-            edge_layers.append(df['num_edge_layers'].mean())
+        scenarios = self._scenarios
+        device_layers = self._stats['dev_layers'].to_numpy()
+        edge_layers = self._stats['edge_layers'].to_numpy()
         
         x_pos = range(len(scenarios))
         width = 0.35
@@ -266,169 +503,73 @@ class SimulationAnalyzer:
         ax.legend()
         ax.grid(True, alpha=0.3, axis='y')
         
-        plt.tight_layout()
-        plt.savefig(self.output_dir / "05_layer_statistics.png", dpi=150, bbox_inches='tight')
-        plt.close()
+        self._save_figure(fig, "05_layer_statistics.png", owned)
         print("  ✓ Layer statistics comparison")
     
-    def plot_scenario_comparison(self):
+    def plot_scenario_comparison(self, fig=None):
         """Create a comprehensive scenario comparison dashboard"""
-        scenarios = sorted(self.data.keys())
+        stats = self._stats
+        scenarios = self._scenarios
         n_scenarios = len(scenarios)
         
-        fig = plt.figure(figsize=(16, 12))
+        fig, owned = self._prepare_figure(fig, (16, 12))
         gs = gridspec.GridSpec(3, 3, figure=fig)
         
         fig.suptitle("Comprehensive Scenario Comparison Dashboard", fontsize=18, fontweight='bold')
         
-        # 1. Avg Device Time
-        ax1 = fig.add_subplot(gs[0, 0])
-        device_avg = [self.data[s]['avg_device_time'].mean() * 1000 for s in scenarios]
-        ax1.bar(range(n_scenarios), device_avg, alpha=0.7, color='#3498db')
-        ax1.set_xticks(range(n_scenarios))
-        ax1.set_xticklabels(scenarios, rotation=45, ha='right', fontsize=8)
-        ax1.set_ylabel('Time (ms)')
-        ax1.set_title('Avg Device Time')
-        ax1.grid(True, alpha=0.3, axis='y')
-        
-        # 2. Avg Edge Time
-        ax2 = fig.add_subplot(gs[0, 1])
-        edge_avg = [self.data[s]['avg_edge_time'].mean() * 1000 for s in scenarios]
-        ax2.bar(range(n_scenarios), edge_avg, alpha=0.7, color='#e74c3c')
-        ax2.set_xticks(range(n_scenarios))
-        ax2.set_xticklabels(scenarios, rotation=45, ha='right', fontsize=8)
-        ax2.set_ylabel('Time (ms)')
-        ax2.set_title('Avg Edge Time')
-        ax2.grid(True, alpha=0.3, axis='y')
-        
-        # 3. Total Time
-        ax3 = fig.add_subplot(gs[0, 2])
-        total_avg = [(self.data[s]['avg_device_time'].mean() + self.data[s]['avg_edge_time'].mean()) * 1000 
-                     for s in scenarios]
-        ax3.bar(range(n_scenarios), total_avg, alpha=0.7, color='#2ecc71')
-        ax3.set_xticks(range(n_scenarios))
-        ax3.set_xticklabels(scenarios, rotation=45, ha='right', fontsize=8)
-        ax3.set_ylabel('Time (ms)')
-        ax3.set_title('Avg Total Time')
-        ax3.grid(True, alpha=0.3, axis='y')
-        
-        # 4. Device Time Variance
-        ax4 = fig.add_subplot(gs[1, 0])
-        device_std = [self.data[s]['avg_device_time'].std() * 1000 for s in scenarios]
-        ax4.bar(range(n_scenarios), device_std, alpha=0.7, color='#9b59b6')
-        ax4.set_xticks(range(n_scenarios))
-        ax4.set_xticklabels(scenarios, rotation=45, ha='right', fontsize=8)
-        ax4.set_ylabel('Std Dev (ms)')
-        ax4.set_title('Device Time Variance')
-        ax4.grid(True, alpha=0.3, axis='y')
-        
-        # 5. Edge Time Variance
-        ax5 = fig.add_subplot(gs[1, 1])
-        edge_std = [self.data[s]['avg_edge_time'].std() * 1000 for s in scenarios]
-        ax5.bar(range(n_scenarios), edge_std, alpha=0.7, color='#f39c12')
-        ax5.set_xticks(range(n_scenarios))
-        ax5.set_xticklabels(scenarios, rotation=45, ha='right', fontsize=8)
-        ax5.set_ylabel('Std Dev (ms)')
-        ax5.set_title('Edge Time Variance')
-        ax5.grid(True, alpha=0.3, axis='y')
-        
-        # 6. Inference Count
-        ax6 = fig.add_subplot(gs[1, 2])
-        counts = [len(self.data[s]) for s in scenarios]
-        ax6.bar(range(n_scenarios), counts, alpha=0.7, color='#1abc9c')
-        ax6.set_xticks(range(n_scenarios))
-        ax6.set_xticklabels(scenarios, rotation=45, ha='right', fontsize=8)
-        ax6.set_ylabel('Count')
-        ax6.set_title('Total Inferences')
-        ax6.grid(True, alpha=0.3, axis='y')
-        
-        # 7. Min Device Time
-        ax7 = fig.add_subplot(gs[2, 0])
-        device_min = [self.data[s]['min_device_time'].mean() * 1000 for s in scenarios]
-        ax7.bar(range(n_scenarios), device_min, alpha=0.7, color='#34495e')
-        ax7.set_xticks(range(n_scenarios))
-        ax7.set_xticklabels(scenarios, rotation=45, ha='right', fontsize=8)
-        ax7.set_ylabel('Time (ms)')
-        ax7.set_title('Min Device Time')
-        ax7.grid(True, alpha=0.3, axis='y')
-        
-        # 8. Max Device Time
-        ax8 = fig.add_subplot(gs[2, 1])
-        device_max = [self.data[s]['max_device_time'].mean() * 1000 for s in scenarios]
-        ax8.bar(range(n_scenarios), device_max, alpha=0.7, color='#c0392b')
-        ax8.set_xticks(range(n_scenarios))
-        ax8.set_xticklabels(scenarios, rotation=45, ha='right', fontsize=8)
-        ax8.set_ylabel('Time (ms)')
-        ax8.set_title('Max Device Time')
-        ax8.grid(True, alpha=0.3, axis='y')
-        
-        # 9. Device Layer Count
-        ax9 = fig.add_subplot(gs[2, 2])
-        device_layer_count = [self.data[s]['num_device_layers'].mean() for s in scenarios]
-        ax9.bar(range(n_scenarios), device_layer_count, alpha=0.7, color='#16a085')
-        ax9.set_xticks(range(n_scenarios))
-        ax9.set_xticklabels(scenarios, rotation=45, ha='right', fontsize=8)
-        ax9.set_ylabel('Avg Layer Count')
-        ax9.set_title('Device Layer Count')
-        ax9.grid(True, alpha=0.3, axis='y')
-        
-        plt.tight_layout()
-        plt.savefig(self.output_dir / "06_scenario_comparison_dashboard.png", dpi=150, bbox_inches='tight')
-        plt.close()
+        # (title, stats column, y label, color) for each dashboard panel, row by row
+        panels = [
+            ('Avg Device Time', 'dev_mean', 'Time (ms)', '#3498db'),
+            ('Avg Edge Time', 'edge_mean', 'Time (ms)', '#e74c3c'),
+            ('Avg Total Time', 'total_mean', 'Time (ms)', '#2ecc71'),
+            ('Device Time Variance', 'dev_std', 'Std Dev (ms)', '#9b59b6'),
+            ('Edge Time Variance', 'edge_std', 'Std Dev (ms)', '#f39c12'),
+            ('Total Inferences', 'n', 'Count', '#1abc9c'),
+            ('Min Device Time', 'dev_min', 'Time (ms)', '#34495e'),
+            ('Max Device Time', 'dev_max', 'Time (ms)', '#c0392b'),
+            ('Device Layer Count', 'dev_layers', 'Avg Layer Count', '#16a085'),
+        ]
+        x_pos = range(n_scenarios)
+        
+        # All panel values as one (scenarios x panels) array from the aggregated frame
+        values = stats[[column for _, column, _, _ in panels]].to_numpy(dtype=float)
+        
+        for idx, (title, _, ylabel, color) in enumerate(panels):
+            ax = fig.add_subplot(gs[idx // 3, idx % 3])
+            ax.bar(x_pos, values[:, idx], alpha=0.7, color=color)
+            ax.set_xticks(x_pos)
+            ax.set_xticklabels(scenarios, rotation=45, ha='right', fontsize=8)
+            ax.set_ylabel(ylabel)
+            ax.set_title(title)
+            ax.grid(True, alpha=0.3, axis='y')
+        
+        self._save_figure(fig, "06_scenario_comparison_dashboard.png", owned)
         print("  ✓ Scenario comparison dashboard")
     
-    def generate_summary_stats(self):
+    def generate_summary_stats(self, fig=None):
         """Generate summary statistics table"""
         summary_data = []
         
-        for scenario in sorted(self.data.keys()):
-            df = self.data[scenario]
-            config = self.configs.get(scenario, {})
-            
-            total_time = (df['avg_device_time'] + df['avg_edge_time']) * 1000
+        for row, config in zip(self._stats.itertuples(), self._configs_ordered):
+            scenario = row.Index
             
             summary_data.append({
                 'Scenario': scenario,
-                'Inferences': len(df),
-                'Device (ms)': f"{df['avg_device_time'].mean() * 1000:.2f} ± {df['avg_device_time'].std() * 1000:.2f}",
-                'Edge (ms)': f"{df['avg_edge_time'].mean() * 1000:.2f} ± {df['avg_edge_time'].std() * 1000:.2f}",
-                'Total (ms)': f"{total_time.mean():.2f} ± {total_time.std():.2f}",
-                'Throughput': f"{len(df) / config.get('duration_seconds', 30):.2f}",
+                'Inferences': row.n,
+                'Device (ms)': f"{row.dev_mean:.2f} ± {row.dev_std:.2f}",
+                'Edge (ms)': f"{row.edge_mean:.2f} ± {row.edge_std:.2f}",
+                'Total (ms)': f"{row.total_mean:.2f} ± {row.total_std:.2f}",
+                'Throughput': f"{row.n / config.get('duration_seconds', 30):.2f}",
                 'Clients': config.get('num_clients', 1),
             })
         
         summary_df = pd.DataFrame(summary_data)
         
-        # Save as CSV
-        summary_csv = self.output_dir / "summary_statistics.csv"
-        summary_df.to_csv(summary_csv, index=False)
-        print(f"  ✓ Summary statistics saved to CSV")
-        
-        # Create a figure with the table
-        fig, ax = plt.subplots(figsize=(16, len(summary_data) * 0.5 + 1))
-        ax.axis('tight')
-        ax.axis('off')
-        
-        table = ax.table(cellText=summary_df.values, colLabels=summary_df.columns,
-                        cellLoc='center', loc='center', bbox=[0, 0, 1, 1])
-        table.auto_set_font_size(False)
-        table.set_fontsize(9)
-        table.scale(1, 2)
+        self.export_table(summary_df, "summary_statistics", scenario_col='Scenario')
+        print(f"  ✓ Summary statistics saved")
         
-        # Style header
-        for i in range(len(summary_df.columns)):
-            table[(0, i)].set_facecolor('#3498db')
-            table[(0, i)].set_text_props(weight='bold', color='white')
-        
-        # Alternate row colors
-        for i in range(1, len(summary_df) + 1):
-            color = '#ecf0f1' if i % 2 == 0 else 'white'
-            for j in range(len(summary_df.columns)):
-                table[(i, j)].set_facecolor(color)
-        
-        plt.title("Summary Statistics", fontsize=16, fontweight='bold', pad=20)
-        plt.savefig(self.output_dir / "07_summary_statistics.png", dpi=150, bbox_inches='tight')
-        plt.close()
+        if self.summary_png:
+            self._plot_summary_table(summary_df, fig)
         
         # Print to console
         print("\n" + "="*120)
@@ -438,19 +579,71 @@ class SimulationAnalyzer:
         print("="*120)
         
         return summary_df
+    
+    def _plot_summary_table(self, summary_df: pd.DataFrame, fig=None):
+        """Render the summary table as one background image plus cell text"""
+        cells = np.vstack([summary_df.columns.to_numpy(dtype=str),
+                           summary_df.astype(str).to_numpy()])
+        nrows, ncols = cells.shape
+        
+        # Header in blue, data rows alternating light grey / white
+        colors = np.where(np.arange(nrows)[:, None] % 2 == 0, '#ecf0f1', 'white')
+        colors[0] = '#3498db'
+        rgb = np.broadcast_to(to_rgba_array(colors.ravel()).reshape(nrows, 1, 4), (nrows, ncols, 4))
+        
+        fig, owned = self._prepare_figure(fig, (16, len(summary_df) * 0.5 + 1))
+        ax = fig.subplots()
+        ax.imshow(rgb, aspect='auto', interpolation='nearest')
+        ax.hlines(np.arange(nrows + 1) - 0.5, -0.5, ncols - 0.5, color='black', linewidth=0.8)
+        ax.vlines(np.arange(ncols + 1) - 0.5, -0.5, nrows - 0.5, color='black', linewidth=0.8)
+        ax.axis('off')
+        
+        for (i, j), value in np.ndenumerate(cells):
+            if i == 0:
+                ax.text(j, i, value, ha='center', va='center', fontsize=9, weight='bold', color='white')
+            else:
+                ax.text(j, i, value, ha='center', va='center', fontsize=9)
+        
+        ax.set_title("Summary Statistics", fontsize=16, fontweight='bold', pad=20)
+        self._save_figure(fig, "07_summary_statistics.png", owned, tight=False)
+    
+    def export_table(self, df: pd.DataFrame, name: str, scenario_col: str = 'scenario') -> List[Path]:
+        """Save a per-scenario table to the analysis folder.
+        
+        Written as Parquet with the scenario column dictionary-encoded when pyarrow
+        is available, as CSV otherwise or additionally when write_csv is set.
+        """
+        paths = []
+        if PYARROW_AVAILABLE:
+            parquet_path = self.output_dir / f"{name}.parquet"
+            df.astype({scenario_col: 'category'}).to_parquet(
+                parquet_path, engine='pyarrow', compression='zstd', index=False
+            )
+            paths.append(parquet_path)
+        if self.write_csv or not PYARROW_AVAILABLE:
+            csv_path = self.output_dir / f"{name}.csv"
+            df.to_csv(csv_path, index=False)
+            paths.append(csv_path)
+        return paths
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python analyze_simulation.py <results_directory>")
-        print("\nExample:")
-        print("  python analyze_simulation.py simulated_results/simulation_20251231_143022")
-        sys.exit(1)
-    
-    results_dir = sys.argv[1]
+    parser = argparse.ArgumentParser(
+        description="Analyze simulation results and generate plots",
+        epilog="Example: python analyze_simulation.py simulated_results/simulation_20251231_143022"
+    )
+    parser.add_argument("results_dir", help="Simulation results directory")
+    parser.add_argument("--csv", action="store_true",
+                        help="Also write summary tables as CSV next to the Parquet files")
+    parser.add_argument("--engine", choices=["pandas", "polars"], default="pandas",
+                        help="Backend used to load and aggregate the results (default: pandas)")
+    parser.add_argument("--no-summary-png", action="store_true",
+                        help="Skip rendering 07_summary_statistics.png (tables are still exported)")
+    args = parser.parse_args()
     
     try:
-        analyzer = SimulationAnalyzer(results_dir)
+        analyzer = SimulationAnalyzer(args.results_dir, write_csv=args.csv, engine=args.engine,
+                                      summary_png=not args.no_summary_png)
         analyzer.analyze_all()
     except Exception as e:
         print(f"\n❌ Error: {e}")
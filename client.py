@@ -2,10 +2,18 @@ import time
 import uuid
 import requests
 import json
+import struct
 import numpy as np
 import tensorflow as tf
 from datetime import datetime
 
+# Se disponibile, orjson decodifica le risposte JSON piu' velocemente
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 # Config
 NUM_LAYERS = 58
 DEVICE_ID = "device_01"
@@ -20,6 +28,19 @@ output_message = None
 best_offloading_layer_index = NUM_LAYERS - 1
 last_multi_output_layer_data = None  # solo per FOMO
 
+# Sessione HTTP condivisa: le connessioni keep-alive vengono riusate tra le richieste
+_SESSION = requests.Session()
+_SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# Interpreti caricati e allocati una sola volta, poi riusati a ogni inferenza
+_INTERPRETERS = []
+_IN_IDX = []
+_OUT_IDX = []
+
+# Header del risultato: timestamp, device id (9 byte), message id (4 byte), layer, dimensione output
+_RESULT_HEADER = struct.Struct("=d9s4siI")
+_RESULT_TIMES_SIZE = struct.Struct("=i")
+
 def get_current_timestamp():
     return time.time()
 
@@ -31,7 +52,7 @@ def register_device():
     url = f"{SERVER}/api/registration"
     payload = {"device_id": DEVICE_ID}
     try:
-        r = requests.post(url, json=payload)
+        r = _SESSION.post(url, json=payload)
         if r.status_code == 200:
             device_registered = True
             print("Device registered")
@@ -43,9 +64,9 @@ def register_device():
 def get_offloading_layer():
     global best_offloading_layer_index
     try:
-        r = requests.get(f"{SERVER}/api/offloading_layer")
+        r = _SESSION.get(f"{SERVER}/api/offloading_layer")
         if r.status_code == 200:
-            data = r.json()
+            data = json_loads(r.content)
             best_offloading_layer_index = data["offloading_layer_index"]
             print(f"Best offloading layer: {best_offloading_layer_index}")
     except Exception as e:
@@ -57,17 +78,27 @@ def load_model(layer_index):
     interpreter.allocate_tensors()
     return interpreter
 
+def init_interpreters():
+    # Da chiamare una volta dopo register_device
+    if _INTERPRETERS:
+        return
+    for i in range(NUM_LAYERS):
+        interpreter = load_model(i)
+        _INTERPRETERS.append(interpreter)
+        _IN_IDX.append(interpreter.get_input_details()[0]['index'])
+        _OUT_IDX.append(interpreter.get_output_details()[0]['index'])
+
 def run_layers(input_data, max_layer):
+    init_interpreters()
     inference_times = []
+    input_data = input_data.astype(np.float32)
     for i in range(max_layer + 1):
         start = time.time()
-        interpreter = load_model(i)
-        input_details = interpreter.get_input_details()
-        output_details = interpreter.get_output_details()
+        interpreter = _INTERPRETERS[i]
 
-        interpreter.set_tensor(input_details[0]['index'], input_data.astype(np.float32))
+        interpreter.set_tensor(_IN_IDX[i], input_data)
         interpreter.invoke()
-        output_data = interpreter.get_tensor(output_details[0]['index'])
+        output_data = interpreter.get_tensor(_OUT_IDX[i])
 
         inference_time = time.time() - start
         inference_times.append(inference_time)
@@ -77,20 +108,26 @@ def run_layers(input_data, max_layer):
 def post_inference_result(output_data, inference_times):
     timestamp = get_current_timestamp()
     msg_uuid = get_uuid()
-    
-    # Invia come JSON o binario
-    payload = {
-        "timestamp": timestamp,
-        "device_id": DEVICE_ID,
-        "message_id": msg_uuid,
-        "offloading_layer_index": best_offloading_layer_index,
-        "output": output_data.tolist(),
-        "inference_times": inference_times
-    }
+    # Nessuna copia se l'output e' gia' float32 contiguo (caso normale TFLite)
+    output_buf = np.ascontiguousarray(output_data, dtype=np.float32)
+
+    times_buf = np.asarray(inference_times, dtype=np.float32)
+
+    # Invia in binario, nello stesso formato letto da RequestHandler._from_raw;
+    # il buffer viene allocato una sola volta della dimensione finale
+    payload = bytearray(_RESULT_HEADER.size + output_buf.nbytes + _RESULT_TIMES_SIZE.size + times_buf.nbytes)
+    _RESULT_HEADER.pack_into(payload, 0, timestamp, DEVICE_ID.encode("ascii"), msg_uuid.encode("ascii"),
+                             best_offloading_layer_index, output_buf.nbytes)
+    off = _RESULT_HEADER.size
+    payload[off:off + output_buf.nbytes] = output_buf.data.cast("B")
+    off += output_buf.nbytes
+    _RESULT_TIMES_SIZE.pack_into(payload, off, times_buf.nbytes)
+    off += _RESULT_TIMES_SIZE.size
+    payload[off:] = times_buf.data.cast("B")
 
     try:
         url = f"{SERVER}/api/device_inference_result"
-        r = requests.post(url, json=payload)
+        r = _SESSION.post(url, data=payload, headers={"Content-Type": "application/octet-stream"})
         print("Inference result sent")
     except Exception as e:
         print(f"Failed to send inference result: {e}")
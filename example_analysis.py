@@ -6,10 +6,53 @@ This script shows how to use the SimulationAnalyzer class programmatically
 to perform custom analysis on simulation results.
 """
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from analyze_simulation import SimulationAnalyzer
 
+# Try to import numba to fuse the outlier scan into one compiled pass
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _mean_std_outliers(a):
+    """Return (mean, sample std, count above mean + 2 std) of a 1-D array"""
+    n = a.size
+    if n == 0:
+        return np.nan, np.nan, 0
+    s = 0.0
+    for x in a:
+        s += x
+    m = s / n
+    v = 0.0
+    for x in a:
+        d = x - m
+        v += d * d
+    sd = (v / (n - 1)) ** 0.5 if n > 1 else np.nan
+    t = m + 2 * sd
+    k = 0
+    for x in a:
+        if x > t:
+            k += 1
+    return m, sd, k
+
+
+if NUMBA_AVAILABLE:
+    mean_std_outliers = njit(cache=True)(_mean_std_outliers)
+    mean_std_outliers(np.zeros(2))  # Compile once up front
+else:
+    def mean_std_outliers(a):
+        """NumPy fallback for the numba kernel"""
+        if a.size == 0:
+            return np.nan, np.nan, 0
+        m = a.mean()
+        sd = a.std(ddof=1)
+        return m, sd, int(np.count_nonzero(a > m + 2 * sd))
+
 
 # Example 1: Generate all plots for a simulation
 print("=" * 80)
@@ -19,17 +62,28 @@ print("=" * 80)
 analyzer = SimulationAnalyzer("simulated_results/simulation_20251231_155838")
 analyzer.analyze_all()
 
+# Per-scenario statistics and per-inference times in ms, already computed by the analyzer
+stats = analyzer._stats
+device_ms = analyzer._dev_ms
+edge_ms = analyzer._edge_ms
+
+
+def min_max(a):
+    """Return (min, max) of a 1-D array, skipping NaN like the analyzer's stats; NaN for an empty one"""
+    a = a[~np.isnan(a)]
+    return (a.min(), a.max()) if a.size else (np.nan, np.nan)
+
 
 # Example 2: Access individual scenario data
 print("\n" + "=" * 80)
 print("EXAMPLE 2: Access Scenario Data")
 print("=" * 80)
 
-for scenario_name, df in analyzer.data.items():
-    print(f"\n{scenario_name}:")
-    print(f"  - Inferences: {len(df)}")
-    print(f"  - Device time (avg): {df['avg_device_time'].mean() * 1000:.2f}ms")
-    print(f"  - Edge time (avg): {df['avg_edge_time'].mean() * 1000:.2f}ms")
+for st in stats.itertuples():
+    print(f"\n{st.Index}:")
+    print(f"  - Inferences: {st.n}")
+    print(f"  - Device time (avg): {st.dev_mean:.2f}ms")
+    print(f"  - Edge time (avg): {st.edge_mean:.2f}ms")
 
 
 # Example 3: Compare two scenarios
@@ -37,11 +91,8 @@ print("\n" + "=" * 80)
 print("EXAMPLE 3: Compare Two Scenarios")
 print("=" * 80)
 
-baseline = analyzer.data["baseline"]
-network = analyzer.data["network_delay_20ms"]
-
-baseline_time = (baseline["avg_device_time"] + baseline["avg_edge_time"]).mean() * 1000
-network_time = (network["avg_device_time"] + network["avg_edge_time"]).mean() * 1000
+baseline_time = stats.at["baseline", "total_mean"]
+network_time = stats.at["network_delay_20ms", "total_mean"]
 impact = ((network_time - baseline_time) / baseline_time) * 100
 
 print(f"Baseline total time: {baseline_time:.2f}ms")
@@ -54,18 +105,18 @@ print("\n" + "=" * 80)
 print("EXAMPLE 4: Multi-Client Analysis")
 print("=" * 80)
 
-single = analyzer.data["multi_client_baseline"]
+single = stats.loc["multi_client_baseline"]
 duration = analyzer.configs["multi_client_baseline"]["duration_seconds"]
 num_clients = analyzer.configs["multi_client_baseline"]["num_clients"]
 
-throughput = len(single) / duration
+throughput = single["n"] / duration
 throughput_per_client = throughput / num_clients
-avg_time = (single["avg_device_time"] + single["avg_edge_time"]).mean() * 1000
+avg_time = single["total_mean"]
 
 print(f"Scenario: multi_client_baseline")
 print(f"  - Duration: {duration}s")
 print(f"  - Clients: {num_clients}")
-print(f"  - Total inferences: {len(single)}")
+print(f"  - Total inferences: {single['n']:.0f}")
 print(f"  - Total throughput: {throughput:.2f} inferences/sec")
 print(f"  - Per-client throughput: {throughput_per_client:.2f} inferences/sec")
 print(f"  - Avg inference time: {avg_time:.2f}ms")
@@ -76,20 +127,19 @@ print("\n" + "=" * 80)
 print("EXAMPLE 5: Statistical Analysis per Scenario")
 print("=" * 80)
 
-for scenario in sorted(analyzer.data.keys()):
-    df = analyzer.data[scenario]
-    
-    device_time = df["avg_device_time"] * 1000
-    edge_time = df["avg_edge_time"] * 1000
-    total_time = device_time + edge_time
+for st in stats.itertuples():
+    scenario = st.Index
+    device_min, device_max = min_max(device_ms[scenario])
+    edge_min, edge_max = min_max(edge_ms[scenario])
+    total_min, total_max = min_max(device_ms[scenario] + edge_ms[scenario])
     
     print(f"\n{scenario}:")
-    print(f"  Device time:  {device_time.mean():6.2f} ± {device_time.std():5.2f} ms "
-          f"(min: {device_time.min():5.2f}, max: {device_time.max():5.2f})")
-    print(f"  Edge time:    {edge_time.mean():6.2f} ± {edge_time.std():5.2f} ms "
-          f"(min: {edge_time.min():5.2f}, max: {edge_time.max():5.2f})")
-    print(f"  Total time:   {total_time.mean():6.2f} ± {total_time.std():5.2f} ms "
-          f"(min: {total_time.min():5.2f}, max: {total_time.max():5.2f})")
+    print(f"  Device time:  {st.dev_mean:6.2f} ± {st.dev_std:5.2f} ms "
+          f"(min: {device_min:5.2f}, max: {device_max:5.2f})")
+    print(f"  Edge time:    {st.edge_mean:6.2f} ± {st.edge_std:5.2f} ms "
+          f"(min: {edge_min:5.2f}, max: {edge_max:5.2f})")
+    print(f"  Total time:   {st.total_mean:6.2f} ± {st.total_std:5.2f} ms "
+          f"(min: {total_min:5.2f}, max: {total_max:5.2f})")
 
 
 # Example 6: Layer distribution analysis
@@ -97,11 +147,10 @@ print("\n" + "=" * 80)
 print("EXAMPLE 6: Layer Distribution")
 print("=" * 80)
 
-for scenario in sorted(analyzer.data.keys()):
-    df = analyzer.data[scenario]
-    
-    avg_device_layers = df["num_device_layers"].mean()
-    avg_edge_layers = df["num_edge_layers"].mean()
+for st in stats.itertuples():
+    scenario = st.Index
+    avg_device_layers = st.dev_layers
+    avg_edge_layers = st.edge_layers
     total_layers = avg_device_layers + avg_edge_layers
     device_pct = (avg_device_layers / total_layers * 100) if total_layers > 0 else 0
     
@@ -114,64 +163,56 @@ print("EXAMPLE 7: Outlier Detection")
 print("=" * 80)
 
 for scenario in ["baseline", "unstable_network"]:
-    if scenario not in analyzer.data:
+    if scenario not in stats.index:
         continue
     
-    df = analyzer.data[scenario]
-    total_time = df["avg_device_time"] + df["avg_edge_time"]
+    n = stats.at[scenario, "n"]
+    total_time = device_ms[scenario] + edge_ms[scenario]
     
-    mean = total_time.mean()
-    std = total_time.std()
+    mean, std, n_outliers = mean_std_outliers(total_time)
     threshold = mean + 2 * std
-    
-    outliers = df[total_time > threshold]
-    pct = len(outliers) / len(df) * 100 if len(df) > 0 else 0
+    pct = n_outliers / n * 100 if n > 0 else 0
     
     print(f"\n{scenario}:")
-    print(f"  Mean total time: {mean * 1000:.2f}ms")
-    print(f"  Std dev: {std * 1000:.2f}ms")
-    print(f"  Outlier threshold (mean + 2σ): {threshold * 1000:.2f}ms")
-    print(f"  Outliers: {len(outliers)} / {len(df)} ({pct:.1f}%)")
+    print(f"  Mean total time: {mean:.2f}ms")
+    print(f"  Std dev: {std:.2f}ms")
+    print(f"  Outlier threshold (mean + 2σ): {threshold:.2f}ms")
+    print(f"  Outliers: {n_outliers} / {n} ({pct:.1f}%)")
     
-    if len(outliers) > 0:
-        print(f"  Outlier times: {[f'{t*1000:.2f}ms' for t in outliers['avg_device_time'] + outliers['avg_edge_time']][:3]}")
+    if n_outliers > 0:
+        print(f"  Outlier times: {[f'{t:.2f}ms' for t in total_time[total_time > threshold]][:3]}")
 
 
 # Example 8: Export custom analysis
 print("\n" + "=" * 80)
-print("EXAMPLE 8: Export Custom Analysis to CSV")
+print("EXAMPLE 8: Export Custom Analysis")
 print("=" * 80)
 
 custom_data = []
 
-for scenario in sorted(analyzer.data.keys()):
-    df = analyzer.data[scenario]
+for st in stats.itertuples():
+    scenario = st.Index
     config = analyzer.configs[scenario]
     
-    device_time = df["avg_device_time"] * 1000
-    edge_time = df["avg_edge_time"] * 1000
-    total_time = device_time + edge_time
-    
     custom_data.append({
         "scenario": scenario,
-        "num_inferences": len(df),
-        "device_avg_ms": device_time.mean(),
-        "device_std_ms": device_time.std(),
-        "edge_avg_ms": edge_time.mean(),
-        "edge_std_ms": edge_time.std(),
-        "total_avg_ms": total_time.mean(),
-        "total_std_ms": total_time.std(),
-        "throughput": len(df) / config.get("duration_seconds", 30),
+        "num_inferences": st.n,
+        "device_avg_ms": st.dev_mean,
+        "device_std_ms": st.dev_std,
+        "edge_avg_ms": st.edge_mean,
+        "edge_std_ms": st.edge_std,
+        "total_avg_ms": st.total_mean,
+        "total_std_ms": st.total_std,
+        "throughput": st.n / config.get("duration_seconds", 30),
         "num_clients": config.get("num_clients", 1),
         "computation_delay": config.get("computation_delay", {}).get("mean", 0),
         "network_delay": config.get("network_delay", {}).get("mean", 0),
     })
 
 custom_df = pd.DataFrame(custom_data)
-output_path = analyzer.output_dir / "custom_analysis.csv"
-custom_df.to_csv(output_path, index=False)
+output_paths = analyzer.export_table(custom_df, "custom_analysis")
 
-print(f"✅ Exported custom analysis to: {output_path}")
+print(f"✅ Exported custom analysis to: {', '.join(str(p) for p in output_paths)}")
 print("\nCustom analysis data:")
 print(custom_df.to_string())
 
@@ -183,14 +224,13 @@ print("=" * 80)
 
 ranking_data = []
 
-for scenario in analyzer.data.keys():
-    df = analyzer.data[scenario]
-    total_time = (df["avg_device_time"] + df["avg_edge_time"]).mean() * 1000
-    throughput = len(df) / analyzer.configs[scenario].get("duration_seconds", 30)
+for st in stats.itertuples():
+    scenario = st.Index
+    throughput = st.n / analyzer.configs[scenario].get("duration_seconds", 30)
     
     ranking_data.append({
         "scenario": scenario,
-        "inference_time_ms": total_time,
+        "inference_time_ms": st.total_mean,
         "throughput": throughput,
     })
 
@@ -207,8 +247,7 @@ print("\n" + "=" * 80)
 print("EXAMPLE 10: Quantify Delay Impact")
 print("=" * 80)
 
-baseline_total = (analyzer.data["baseline"]["avg_device_time"] + 
-                  analyzer.data["baseline"]["avg_edge_time"]).mean() * 1000
+baseline_total = stats.at["baseline", "total_mean"]
 
 print(f"Baseline inference time: {baseline_total:.2f}ms\n")
 
@@ -221,11 +260,10 @@ scenarios_with_delays = [
 ]
 
 for scenario, label in scenarios_with_delays:
-    if scenario not in analyzer.data:
+    if scenario not in stats.index:
         continue
     
-    scenario_total = (analyzer.data[scenario]["avg_device_time"] + 
-                     analyzer.data[scenario]["avg_edge_time"]).mean() * 1000
+    scenario_total = stats.at[scenario, "total_mean"]
     
     absolute_impact = scenario_total - baseline_total
     relative_impact = (absolute_impact / baseline_total) * 100
@@ -4,36 +4,30 @@ Convenience script to generate statistics and plots for SCIoT system.
 Run this from the project root directory.
 """
 
-import subprocess
 import sys
+import traceback
 from pathlib import Path
 
 
-def run_command(cmd, description):
-    """Run a command and report its status."""
+def run_step(step, description):
+    """Run a step in this process and report its status."""
     print(f"\n{'='*70}")
     print(f"{description}")
     print(f"{'='*70}")
     
     try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        if result.stdout:
-            print(result.stdout)
-        print(f"✓ {description} completed successfully")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"✗ {description} failed with exit code {e.returncode}")
-        if e.stdout:
-            print("STDOUT:", e.stdout)
-        if e.stderr:
-            print("STDERR:", e.stderr)
+        exit_code = step()
+    except SystemExit as e:
+        exit_code = e.code
+    except Exception:
+        traceback.print_exc()
+        exit_code = 1
+    
+    if exit_code:
+        print(f"✗ {description} failed with exit code {exit_code}")
         return False
+    print(f"✓ {description} completed successfully")
+    return True
 
 
 def main():
@@ -47,9 +41,13 @@ def main():
         print("Error: Please run this script from the project root directory")
         sys.exit(1)
     
+    # Both steps run in this process, so pandas/matplotlib are only imported once
+    sys.path.insert(0, str(Path("src").resolve()))
+    from server.statistics import generate_statistics, generate_plots
+    
     # Generate statistics
-    success = run_command(
-        "python src/server/statistics/generate_statistics.py",
+    success = run_step(
+        lambda: generate_statistics.main([]),
         "Generating Statistics"
     )
     
@@ -58,8 +56,8 @@ def main():
         sys.exit(1)
     
     # Generate plots
-    success = run_command(
-        "python src/server/statistics/generate_plots.py",
+    success = run_step(
+        lambda: generate_plots.main([]),
         "Generating Plots"
     )
     
@@ -6,10 +6,15 @@ under different conditions.
 
 import time
 import random
+import numpy as np
 from typing import Optional, Dict, Any
 from enum import Enum
 
 
+# Generator for drawing several delays in one call
+_RNG = np.random.default_rng()
+
+
 class DelayType(Enum):
     """Types of delay distributions."""
     NONE = "none"
@@ -64,6 +69,47 @@ class DelaySimulator:
             time.sleep(delay)
         return delay
     
+    def apply_delays(self, count: int) -> float:
+        """
+        Apply the configured delay for count operations with a single sleep.
+        
+        Args:
+            count: Number of operations (e.g. layers run as one fused model)
+        
+        Returns:
+            The total delay applied in seconds
+        """
+        if not self.enabled or self.delay_type == DelayType.NONE or count <= 0:
+            return 0.0
+        
+        delay = float(self._calculate_delays(count).sum())
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+    
+    def _calculate_delays(self, count: int) -> np.ndarray:
+        """Draw count delays at once, with the same distributions as _calculate_delay."""
+        if self.delay_type == DelayType.STATIC:
+            return np.full(count, self.config.get('value', 0.0))
+        
+        elif self.delay_type == DelayType.GAUSSIAN:
+            mean = self.config.get('mean', 0.0)
+            std_dev = self.config.get('std_dev', 0.0)
+            # Ensure non-negative delays
+            return np.maximum(0.0, _RNG.normal(mean, std_dev, count))
+        
+        elif self.delay_type == DelayType.UNIFORM:
+            min_val = self.config.get('min', 0.0)
+            max_val = self.config.get('max', 0.0)
+            return _RNG.uniform(min_val, max_val, count)
+        
+        elif self.delay_type == DelayType.EXPONENTIAL:
+            mean = self.config.get('mean', 0.0)
+            if mean > 0:
+                return _RNG.exponential(mean, count)
+        
+        return np.zeros(count)
+    
     def _calculate_delay(self) -> float:
         """Calculate delay based on configuration."""
         if self.delay_type == DelayType.STATIC:
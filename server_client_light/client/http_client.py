@@ -5,11 +5,22 @@ import struct
 import requests
 import time
 import random
+import secrets
+import hashlib
 import os
 import yaml
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import json
 from delay_simulator import DelaySimulator
 
+# Try to import orjson for faster response decoding
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = SCRIPT_DIR.parent.parent.parent
@@ -20,6 +31,7 @@ with open(CONFIG_PATH, "r") as f:
     config = yaml.safe_load(f)
 
 DEVICE_ID = config["client"]["device_id"]
+DEVICE_BLOB = DEVICE_ID.encode("ascii").ljust(9, b'\x00')  # fixed-width id field of the result header
 SERVER_HOST = config["http"]["server_host"]
 SERVER_PORT = config["http"]["server_port"]
 SERVER = f"http://{SERVER_HOST}:{SERVER_PORT}"
@@ -32,9 +44,36 @@ LAST_OFFLOADING_LAYER = MODEL_CONFIG["last_offloading_layer"]
 IMAGE_PATH = SCRIPT_DIR / MODEL_CONFIG["image_name"]
 TFLITE_DIR = SCRIPT_DIR / MODEL_CONFIG["tflite_subdir"]
 SUBMODEL_PREFIX = MODEL_CONFIG["submodel_prefix"]
+FUSED_PREFIX = MODEL_CONFIG.get("fused_prefix", "prefix")
+# Frames run together in one batched pass (resize_tensor_input), gathered for at most max_batch_latency_ms
+MAX_BATCH_SIZE = MODEL_CONFIG.get("max_batch_size", 1)
+MAX_BATCH_LATENCY = MODEL_CONFIG.get("max_batch_latency_ms", 100) / 1000
+# Feed raw uint8 pixels to <prefix>_0_uint8.tflite, which rescales them itself (see model_split.py)
+UINT8_INPUT = MODEL_CONFIG.get("uint8_input", False)
+# Raw pixels read as quantized values: pixel * (1/255) gives the model's [0, 1] float input
+PIXEL_QUANTIZATION = (1.0 / 255, 0)
+# Use the int8 submodels (<prefix>_<i>_int8.tflite) exported by model_split.py
+SUBMODEL_SUFFIX = "_int8" if MODEL_CONFIG.get("quantized", False) else ""
+
+# Interpreter threads (default: all cores) and the XNNPACK CPU delegate (on unless disabled)
+NUM_THREADS = MODEL_CONFIG.get("num_threads") or os.cpu_count()
+OP_RESOLVER = (tf.lite.experimental.OpResolverType.BUILTIN if MODEL_CONFIG.get("xnnpack", True)
+               else tf.lite.experimental.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES)
 
 ENDPOINTS = config["http"]["endpoints"]
 
+def create_session():
+    """HTTP session whose keep-alive connections are reused across requests"""
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    # Lets the server keep per-device state (e.g. the hash of the last uploaded image)
+    session.headers["X-Device-Id"] = DEVICE_ID
+    return session
+
+# requests.Session is not thread-safe: the main thread and the result uploader each get their own
+SESSION = create_session()
+UPLOAD_SESSION = create_session()
+
 # Initialize delay simulators
 DELAY_CONFIG = config.get("delay_simulation", {})
 computation_delay = DelaySimulator(DELAY_CONFIG.get("computation"))
@@ -47,7 +86,7 @@ if network_delay.enabled:
 
 # Function to generate a random message ID
 def generate_message_id():
-    return ''.join(random.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", k=4))
+    return secrets.token_hex(2).upper()
 
 # ---------------------
 #  Registration
@@ -56,7 +95,7 @@ def register_device():
     url = f"{SERVER}{ENDPOINTS['registration']}"
     payload = {"device_id": DEVICE_ID}
     try:
-        r = requests.post(url, json=payload, timeout=5)
+        r = SESSION.post(url, json=payload, timeout=5)
         print("Registration:", r.status_code, r.text)
         return True
     except requests.exceptions.RequestException as e:
@@ -67,34 +106,51 @@ def register_device():
 # ------------------------------------------------
 #  Convert image to RGB565 and send to server
 # ------------------------------------------------
+def rgb888_to_rgb565(data):
+    """Pack an (H, W, 3) uint8 RGB array into big-endian RGB565 bytes"""
+    data = data.astype(np.uint16)
+    r, g, b = data[..., 0], data[..., 1], data[..., 2]
+    rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+    return rgb565.astype(">u2").tobytes()
+
 def send_image():
+    """Send the input image; return the offloading layer carried by the response, or None"""
     url = f"{SERVER}{ENDPOINTS['device_input']}"
-    img = Image.open(str(IMAGE_PATH)).resize((INPUT_HEIGHT, INPUT_WIDTH)).convert("RGB")
-    data = np.array(img)
-    rgb565 = []
-    for y in range(96):
-        for x in range(96):
-            r, g, b = data[y, x]
-            rgb = ((r >> 3) << 11) | ((g >> 2) << 5) | (b >> 3)
-            rgb565.append(rgb)
-    rgb565_bytes = struct.pack(f">{len(rgb565)}H", *rgb565)
+    _, rgb565_bytes = load_cached_image(IMAGE_PATH)
+    image_hash = IMAGE_CACHE["hash"]
     try:
-        r = requests.post(url, data=rgb565_bytes, headers={"Content-Type": "application/octet-stream"}, timeout=5)
+        # Once the server holds this image, only its hash is sent; 304 confirms it is unchanged
+        if IMAGE_CACHE["sent_hash"] == image_hash:
+            r = SESSION.post(url, headers={"X-Image-Hash": image_hash}, timeout=5)
+            if r.status_code == 304:
+                print("Image unchanged:", r.status_code)
+                return offloading_layer_from(r)
+        r = SESSION.post(url, data=rgb565_bytes, timeout=5,
+                         headers={"Content-Type": "application/octet-stream", "X-Image-Hash": image_hash})
+        IMAGE_CACHE["sent_hash"] = image_hash if r.status_code == 200 else None
         print("Image sent:", r.status_code)
-        return True
+        return offloading_layer_from(r) if r.status_code == 200 else None
     except requests.exceptions.RequestException as e:
         print(f"⚠ Image send failed (server unreachable): {e}")
-        return False
+        return None
 
 # ----------------------------
 #  Request Best Offloading Layer
 # ----------------------------
+def offloading_layer_from(r):
+    """Return the offloading decision sent in the X-Offloading-Layer header; None if the server sent none"""
+    best_layer = r.headers.get("X-Offloading-Layer")
+    if best_layer is None:
+        return None
+    print("Best layer received:", best_layer)
+    return int(best_layer)
+
 def get_offloading_layer():
     url = f"{SERVER}{ENDPOINTS['offloading_layer']}"
     try:
-        r = requests.get(url, timeout=5)
+        r = SESSION.get(url, timeout=5)
         if r.status_code == 200:
-            best_layer = r.json().get("offloading_layer_index", LAST_OFFLOADING_LAYER)
+            best_layer = json_loads(r.content).get("offloading_layer_index", LAST_OFFLOADING_LAYER)
             print("Best layer received:", best_layer)
             return best_layer
         else:
@@ -108,9 +164,9 @@ def get_offloading_layer():
 # TEST: Simulate random best offloading layer change
 def get_offloading_layer_random():
     url = f"{SERVER}{ENDPOINTS['offloading_layer']}"
-    r = requests.get(url)
+    r = SESSION.get(url)
     if r.status_code == 200:
-        best_layer = r.json().get("offloading_layer_index", LAST_OFFLOADING_LAYER)
+        best_layer = json_loads(r.content).get("offloading_layer_index", LAST_OFFLOADING_LAYER)
         print("Best layer received:", best_layer)
         return random.randint(0, LAST_OFFLOADING_LAYER)
         #return best_layer
@@ -128,26 +184,155 @@ def load_image_rgb(path):
     img_np = np.expand_dims(img_np, axis=0)  # [1,96,96,3]
     return img_np
 
+# Decoded input image, reloaded only when the file changes on disk
+IMAGE_CACHE = {"path": None, "mtime": None, "input": None, "rgb565": None, "hash": None, "sent_hash": None}
+
+def load_cached_image(path):
+    """Return (model input [1,H,W,3], RGB565 bytes) for path, decoding it only when it changed.
+
+    The input is raw uint8 pixels with UINT8_INPUT, float32 in [0, 1] otherwise.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    if IMAGE_CACHE["path"] != path or IMAGE_CACHE["mtime"] != mtime:
+        img = Image.open(str(path)).resize((INPUT_HEIGHT, INPUT_WIDTH)).convert("RGB")
+        data = np.asarray(img)
+        rgb565 = rgb888_to_rgb565(data)
+        IMAGE_CACHE.update(
+            path=path,
+            mtime=mtime,
+            input=np.expand_dims(data if UINT8_INPUT else data.astype(np.float32) / 255.0, axis=0),
+            rgb565=rgb565,
+            hash=hashlib.blake2b(rgb565, digest_size=16).hexdigest(),
+        )
+    return IMAGE_CACHE["input"], IMAGE_CACHE["rgb565"]
+
+# (interpreter, input_details, output_details) per submodel, built once by load_interpreters()
+INTERPRETERS = []
+# Same tuples for the fused prefix models (submodels 0..k in one graph), keyed by k
+PREFIX_INTERPRETERS = {}
+
+# .tflite file contents, read from disk once per process
+MODEL_BLOBS = {}
+
+def _build_interpreter(model_path):
+    if model_path not in MODEL_BLOBS:
+        MODEL_BLOBS[model_path] = Path(model_path).read_bytes()
+    interpreter = tf.lite.Interpreter(model_content=MODEL_BLOBS[model_path], num_threads=NUM_THREADS,
+                                      experimental_op_resolver_type=OP_RESOLVER)
+    interpreter.allocate_tensors()
+    return interpreter, interpreter.get_input_details(), interpreter.get_output_details()
+
+def load_interpreters(tflite_dir):
+    """Build and allocate one interpreter per submodel (and per fused prefix) so inference can reuse them"""
+    INTERPRETERS.clear()
+    for i in range(LAST_OFFLOADING_LAYER + 1):
+        suffix = "_uint8" if i == 0 and UINT8_INPUT else SUBMODEL_SUFFIX
+        INTERPRETERS.append(_build_interpreter(tflite_dir / f"{SUBMODEL_PREFIX}_{i}{suffix}.tflite"))
+    
+    # Optional prefixes exported by src/server/models/model_split.py
+    PREFIX_INTERPRETERS.clear()
+    for model_path in tflite_dir.glob(f"{FUSED_PREFIX}_*.tflite"):
+        stop_layer = int(model_path.stem.rsplit("_", 1)[1])
+        if stop_layer <= LAST_OFFLOADING_LAYER:
+            PREFIX_INTERPRETERS[stop_layer] = _build_interpreter(model_path)
+    if PREFIX_INTERPRETERS:
+        print(f"Fused prefixes available for layers: {sorted(PREFIX_INTERPRETERS)}")
+
+def dequantize(data, quantization):
+    """Map int8/uint8 data with (scale, zero_point) back to float32; float data (scale 0) is returned as is"""
+    scale, zero_point = quantization
+    if not scale:
+        return data
+    return (data.astype(np.float32) - zero_point) * np.float32(scale)
+
+def to_input_tensor(data, quantization, details):
+    """Convert data, quantized with (scale, zero_point), to the dtype and quantization of an input tensor"""
+    scale, zero_point = details['quantization']
+    if not scale and data.dtype == details['dtype'] == np.uint8:
+        return data  # a plain uint8 input takes raw pixels
+    if (scale and data.dtype == details['dtype'] and quantization[1] == zero_point
+            and np.isclose(quantization[0], scale, rtol=1e-6)):
+        return data  # int8 activations pass straight through between submodels
+    data = dequantize(data, quantization)
+    if not scale:
+        return data.astype(details['dtype'], copy=False)  # no copy when the dtype already matches
+    info = np.iinfo(details['dtype'])
+    return np.clip(np.round(data / scale) + zero_point, info.min, info.max).astype(details['dtype'])
+
+BATCH_POLL_INTERVAL = 0.005
+
+def collect_frames(path):
+    """Stack up to MAX_BATCH_SIZE frames into one [N,H,W,3] batch, stopping once MAX_BATCH_LATENCY has passed.
+
+    Only new frames (the image file changed on disk) are added, never copies of the same one.
+    """
+    frames = [load_cached_image(path)[0]]
+    if MAX_BATCH_SIZE > 1:
+        deadline = time.monotonic() + MAX_BATCH_LATENCY
+        mtime = IMAGE_CACHE["mtime"]
+        while len(frames) < MAX_BATCH_SIZE and time.monotonic() < deadline:
+            time.sleep(BATCH_POLL_INTERVAL)
+            frame = load_cached_image(path)[0]
+            if IMAGE_CACHE["mtime"] != mtime:
+                mtime = IMAGE_CACHE["mtime"]
+                frames.append(frame)
+    return frames[0] if len(frames) == 1 else np.concatenate(frames)
+
+def _fit_input(interpreter, input_details, output_details, shape):
+    """Resize the interpreter's input to shape (e.g. a batch) if needed; return the updated details"""
+    if tuple(shape) != tuple(input_details[0]['shape']):
+        interpreter.resize_tensor_input(input_details[0]['index'], shape)
+        interpreter.allocate_tensors()
+        input_details = interpreter.get_input_details()
+        output_details = interpreter.get_output_details()
+    return input_details, output_details
+
 def run_split_inference(image, tflite_dir, stop_layer):
+    if not INTERPRETERS:
+        load_interpreters(tflite_dir)
     input_data = image
-    inference_times = []
+    # of input_data; scale 0 means float, uint8 images are raw pixels
+    quantization = PIXEL_QUANTIZATION if image.dtype == np.uint8 else (0.0, 0)
     
     # Handle -1 as "run all layers until the end"
     if stop_layer == -1:
         stop_layer = LAST_OFFLOADING_LAYER
         print(f"Offloading layer -1: Running all {stop_layer + 1} layers locally")
     
-    for i in range(stop_layer + 1):
-        model_path = str(tflite_dir / f"{SUBMODEL_PREFIX}_{i}.tflite")
-        interpreter = tf.lite.Interpreter(model_path=model_path)
-        interpreter.allocate_tensors()
-        input_details = interpreter.get_input_details()
-        output_details = interpreter.get_output_details()
+    # Per-layer times in seconds, sent to the server as is
+    inference_times = np.empty(stop_layer + 1, dtype=np.float32)
+    
+    # Run the longest fused prefix that fits in one invoke, then the remaining layers one by one
+    start_layer = 0
+    fused = [k for k in PREFIX_INTERPRETERS if k <= stop_layer]
+    if fused:
+        k = max(fused)
+        interpreter, input_details, output_details = PREFIX_INTERPRETERS[k]
+        input_details, output_details = _fit_input(interpreter, input_details, output_details, input_data.shape)
+        PREFIX_INTERPRETERS[k] = (interpreter, input_details, output_details)
+        np.copyto(interpreter.tensor(input_details[0]['index'])(), to_input_tensor(input_data, quantization, input_details[0]))
+        
+        t0 = time.perf_counter()
+        if computation_delay.enabled:
+            delay = computation_delay.apply_delays(k + 1)  # one sleep for the whole prefix
+            print(f"  Layers 0-{k} computation delay: {delay*1000:.2f}ms")
+        interpreter.invoke()
+        t1 = time.perf_counter()
+        
+        input_data = interpreter.tensor(output_details[0]['index'])()
+        quantization = output_details[0]['quantization']
+        print(f"Layers 0-{k} OK (fused, {(t1 - t0)*1000:.2f}ms) → output shape: {input_data.shape}")
+        start_layer = k + 1
+    
+    for i in range(start_layer, stop_layer + 1):
+        interpreter, input_details, output_details = INTERPRETERS[i]
+        input_details, output_details = _fit_input(interpreter, input_details, output_details, input_data.shape)
+        INTERPRETERS[i] = (interpreter, input_details, output_details)
 
-        input_data = input_data.astype(input_details[0]['dtype'])
-        interpreter.set_tensor(input_details[0]['index'], input_data)
+        # Write straight into the interpreter's input buffer instead of copying through set_tensor
+        np.copyto(interpreter.tensor(input_details[0]['index'])(), to_input_tensor(input_data, quantization, input_details[0]))
 
-        t0 = time.time()
+        t0 = time.perf_counter()
         
         # Apply artificial computation delay
         if computation_delay.enabled:
@@ -155,14 +340,25 @@ def run_split_inference(image, tflite_dir, stop_layer):
             print(f"  Layer {i} computation delay: {delay*1000:.2f}ms")
         
         interpreter.invoke()
-        t1 = time.time()
-        inference_times.append(t1 - t0)
+        t1 = time.perf_counter()
+        inference_times[i] = t1 - t0
         # Increase inference time with random time -> simulate a slower client
         #t = ((t1-t0) + random.uniform(0,0.02))
-        #inference_times.append(t)
-        input_data = interpreter.get_tensor(output_details[0]['index'])
+        #inference_times[i] = t
+        # View of the output buffer; it is copied directly into the next interpreter's input
+        input_data = interpreter.tensor(output_details[0]['index'])()
+        quantization = output_details[0]['quantization']
         print(f"Layer {i} OK → output shape: {input_data.shape}")
-    return input_data, inference_times
+    # A fused prefix has no per-layer times, and the server reads the times from layer 0 on:
+    # report none rather than made-up ones (the server then leaves its device times as they are)
+    if start_layer:
+        inference_times = inference_times[:0]
+    # Copy the last output out of the interpreter before it is invoked again
+    return dequantize(input_data.copy(), quantization), inference_times
+
+# timestamp, device id (9 bytes), message id (4 bytes), offloading layer, output size; no padding
+RESULT_HEADER = struct.Struct("=d9s4siI")
+RESULT_TIMES_SIZE = struct.Struct("=i")
 
 def send_inference_result(output_data, inference_times, layer_index, message_id):
     # Apply network delay before sending
@@ -173,18 +369,23 @@ def send_inference_result(output_data, inference_times, layer_index, message_id)
     url = f"{SERVER}{ENDPOINTS['device_inference_result']}"
     timestamp = time.time()
 
-    buffer = bytearray()
-    buffer += struct.pack("d", timestamp)
-    buffer += DEVICE_ID.encode("ascii").ljust(9, b'\x00')
-    buffer += message_id.encode("ascii").ljust(4, b'\x00')
-    buffer += struct.pack("i", layer_index)
-    buffer += struct.pack("I", output_data.nbytes)
-    buffer += output_data.tobytes()
-    buffer += struct.pack("i", len(inference_times) * 4)
-    buffer += np.array(inference_times, dtype=np.float32).tobytes()
+    output_bytes = np.ascontiguousarray(output_data).reshape(-1).view(np.uint8)
+    times_bytes = np.asarray(inference_times, dtype=np.float32).view(np.uint8)  # no copy for float32 arrays
+
+    # Write header, output and times straight into one buffer of the final size
+    buffer = bytearray(RESULT_HEADER.size + output_bytes.nbytes + RESULT_TIMES_SIZE.size + times_bytes.nbytes)
+    RESULT_HEADER.pack_into(buffer, 0, timestamp, DEVICE_BLOB, message_id.encode("ascii"),
+                            layer_index, output_bytes.nbytes)
+    offset = RESULT_HEADER.size
+    view = memoryview(buffer)
+    view[offset:offset + output_bytes.nbytes] = output_bytes
+    offset += output_bytes.nbytes
+    RESULT_TIMES_SIZE.pack_into(buffer, offset, times_bytes.nbytes)
+    offset += RESULT_TIMES_SIZE.size
+    view[offset:] = times_bytes
 
     try:
-        r = requests.post(url, data=buffer, headers={"Content-Type": "application/octet-stream"}, timeout=5)
+        r = UPLOAD_SESSION.post(url, data=buffer, headers={"Content-Type": "application/octet-stream"}, timeout=5)
         print("Output sent:", r.status_code)
         return True
     except requests.exceptions.RequestException as e:
@@ -192,6 +393,19 @@ def send_inference_result(output_data, inference_times, layer_index, message_id)
         print("  → Local inference completed, result not synchronized")
         return False
 
+def send_inference_results(outputs, inference_times, layer_index):
+    """Send one result per frame of a batch.
+
+    A single frame carries its measured layer times. Frames of a larger batch carry none:
+    per-frame times were never measured, and the server only updates its device times
+    (EMA and variance tracking) from results that carry them.
+    """
+    if len(outputs) > 1:
+        inference_times = inference_times[:0]
+    sent = [send_inference_result(output[np.newaxis], inference_times, layer_index, generate_message_id())
+            for output in outputs]
+    return all(sent)
+
 # -----
 # MAIN
 # -----
@@ -208,24 +422,32 @@ def main():
         print("\n⚠ Server not available - Running in LOCAL-ONLY mode")
         print("  Client will continue and retry server connection on each request\n")
     
+    load_interpreters(TFLITE_DIR)
+    
+    # Results are uploaded in the background while the next cycle sends its image and runs inference
+    uploader = ThreadPoolExecutor(max_workers=1)
+    pending_upload = None
+    
     while True:
-        # Try to send image (optional, just for server tracking)
-        send_image()
-        
-        # Get offloading decision (fallback to local if server unreachable)
-        best_layer = get_offloading_layer()
+        # Try to send image; the response also carries the current offloading decision
+        best_layer = send_image()
         
-        time.sleep(1)  # Ensure server has processed the request
-        message_id = generate_message_id()
-        image = load_image_rgb(IMAGE_PATH)
+        # Otherwise ask for it (fallback to local if server unreachable)
+        if best_layer is None:
+            best_layer = get_offloading_layer()
+        frames = collect_frames(IMAGE_PATH)
         
         # Always run inference (local or split based on best_layer)
-        output_data, inference_times = run_split_inference(image, TFLITE_DIR, best_layer)
+        output_data, inference_times = run_split_inference(frames, TFLITE_DIR, best_layer)
+        
+        # The previous result was uploaded alongside this cycle; wait for it so only one upload is in flight
+        if pending_upload is not None:
+            pending_upload.result()
         
         # Try to send results (for variance tracking and algorithm updates)
-        send_inference_result(output_data, inference_times, best_layer, message_id)
+        pending_upload = uploader.submit(send_inference_results, output_data, inference_times, best_layer)
         
         print(f"✓ Inference complete (layers 0-{best_layer})\n")
 
-main()
-
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,18 @@ import numpy as np
 import yaml
 from pathlib import Path
 
+# Try to import orjson for faster message parsing
+try:
+    import orjson
+    json_loads = orjson.loads
+
+    def json_dumps(obj):
+        # decoded to str so registration still goes out as a text frame
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).resolve().parent
 CONFIG_PATH = SCRIPT_DIR / "websocket_config.yaml"
@@ -63,18 +75,12 @@ def generate_message_uuid() -> str:
 
 def convert_to_rgb565_raw(path: str) -> bytes:
     img = Image.open(str(path)).convert("RGB")
-    w, h = img.size
-    rgb = np.asarray(img)
-    raw = bytearray()
-    for y in range(h):
-        for x in range(w):
-            r, g, b = rgb[y, x]
-            # Pack to 5/6/5 bits
-            rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
-            # little endian 16-bit
-            raw.append(rgb565 & 0xFF)
-            raw.append((rgb565 >> 8) & 0xFF)
-    return bytes(raw)
+    data = np.asarray(img, dtype=np.uint16)
+    r, g, b = data[..., 0], data[..., 1], data[..., 2]
+    # pack 5/6/5 bits for every pixel at once, as http_client.rgb888_to_rgb565 does
+    rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+    # little endian 16-bit
+    return rgb565.astype("<u2").tobytes()
 
 # 4. Posting functions
 async def post_registration(ws):
@@ -84,7 +90,7 @@ async def post_registration(ws):
         "device_id": DEVICE_ID,
         "message_id": message_uuid
     }
-    await ws.send(json.dumps(payload))
+    await ws.send(json_dumps(payload))
     print(f"[Client] Registration sent: {payload}")
 
 async def post_device_input(ws):
@@ -92,19 +98,25 @@ async def post_device_input(ws):
     print(f"[Client] Sending device input, {len(raw)} bytes")
     await ws.send(raw)
 
+# timestamp, device id (9 bytes), message id (4 bytes), offloading layer, output size
+RESULT_HEADER = struct.Struct('<d9s4siI')
+RESULT_TIMES_SIZE = struct.Struct('<i')
+
 async def post_device_inference_result(ws, output_data: bytes, offlayer: int, inf_times: list):
     # Build binary message same format as ESP32
     ts = time.time() + offset
-    buf = bytearray()
-    buf.extend(struct.pack('<d', ts))
-    buf.extend(DEVICE_ID.encode('utf-8')[:9].ljust(9, b'\x00'))
-    buf.extend(message_uuid.encode('utf-8')[:4].ljust(4, b'\x00'))
-    buf.extend(struct.pack('<i', offlayer))
-    buf.extend(struct.pack('<I', len(output_data)))
-    buf.extend(output_data)
-    buf.extend(struct.pack('<i', len(inf_times)*4))  # size in bytes
-    for t in inf_times:
-        buf.extend(struct.pack('<f', t))
+    # '9s'/'4s' truncate and zero-pad the ids like the ESP32 fixed-width fields
+    times_bytes = np.asarray(inf_times, dtype='<f4').tobytes()
+    # Allocate the final size once and write each region in place
+    buf = bytearray(RESULT_HEADER.size + len(output_data) + RESULT_TIMES_SIZE.size + len(times_bytes))
+    RESULT_HEADER.pack_into(buf, 0, ts, DEVICE_ID.encode('utf-8'), message_uuid.encode('utf-8'),
+                            offlayer, len(output_data))
+    off = RESULT_HEADER.size
+    buf[off:off + len(output_data)] = output_data
+    off += len(output_data)
+    RESULT_TIMES_SIZE.pack_into(buf, off, len(times_bytes))  # size in bytes
+    off += RESULT_TIMES_SIZE.size
+    buf[off:] = times_bytes
     print(f"[Client] Sending inference result, total {len(buf)} bytes")
     await ws.send(buf)
 
@@ -114,7 +126,7 @@ async def handle_messages(ws):
     async for message in ws:
         # Try JSON
         try:
-            msg = json.loads(message)
+            msg = json_loads(message)
             channel = msg.get('channel')
             if channel == 'registration':
                 device_registered = True
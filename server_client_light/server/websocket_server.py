@@ -6,6 +6,7 @@ Preliminary operations:
 '''
 
 # server.py
+import os
 import time
 import ntplib
 import asyncio
@@ -15,12 +16,21 @@ from tensorflow.lite.python.interpreter import Interpreter
 from PIL import Image
 import numpy as np
 
+# Try to import orjson for faster message parsing
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 NTP_SERVER = "pool.ntp.org"
 WS_ENDPOINT = "/ws"
 HOST = "0.0.0.0"
 PORT = 8000
 MODEL_PATH = "model.tflite"
 BASELINE_IMAGE = "random.png"  # image for baseline test
+# Interpreter threads, capped at 4 so big.LITTLE efficiency cores do not slow the conv layers
+NUM_THREADS = min(4, os.cpu_count() or 1)
 
 app = FastAPI()
 
@@ -41,7 +51,8 @@ def sync_time(server: str = NTP_SERVER) -> float:
 
 def baseline_inference(model_path: str, image_path: str, offset: float):
     # Load TFLite model
-    interpreter = Interpreter(model_path)
+    # The default op resolver applies the XNNPACK delegate to float conv/depthwise layers
+    interpreter = Interpreter(model_path, num_threads=NUM_THREADS)
     interpreter.allocate_tensors()
     # Preprocess image
     img = Image.open(image_path).convert('RGB')
@@ -79,7 +90,18 @@ async def websocket_endpoint(ws: WebSocket):
         await ws.send_json(init_msg)
         # After init, other messages will follow...
         while True:
-            data = await ws.receive_text()
+            # receive() instead of receive_text(): binary frames (device input, inference
+            # results) are used as is, without a UTF-8 decode
+            message = await ws.receive()
+            if message['type'] == 'websocket.disconnect':
+                raise WebSocketDisconnect(message.get('code', 1000))
+            data = message.get('bytes')
+            if data is None:
+                try:
+                    data = json_loads(message['text'])  # orjson raises a JSONDecodeError subclass
+                except json.JSONDecodeError as e:
+                    print(f"[Server] Ignoring malformed text frame: {e}")
+                    continue
             # ... handle registration, input, inference
     except WebSocketDisconnect:
         print("[Server] Client disconnected")
@@ -25,7 +25,31 @@ from datetime import datetime
 import threading
 import signal
 import os
+import shutil
+import copy
 import requests
+import numpy as np
+
+# Use the libyaml C loader/dumper when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
+# Try to import orjson for faster parsing of the server data files
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Optional: with watchdog the runner reacts to server data file writes instead of polling them
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
 
 # Configuration
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -34,10 +58,20 @@ CLIENT_DIR = SCRIPT_DIR / "server_client_light" / "client"
 CLIENT_CONFIG_FILE = CLIENT_DIR / "http_config.yaml"
 SERVER_SETTINGS_FILE = SCRIPT_DIR / "src" / "server" / "settings.yaml"
 RESULTS_DIR = SCRIPT_DIR / "simulated_results"
+DEVICE_TIMES_FILE = SCRIPT_DIR / "src" / "server" / "device_inference_times.json"
+EDGE_TIMES_FILE = SCRIPT_DIR / "src" / "server" / "edge_inference_times.json"
+# The server re-reads settings.yaml and resets its state on this endpoint (see HttpServer)
+SERVER_RELOAD_ENDPOINT = "/api/reload_config"
 
 # Ensure results directory exists
 RESULTS_DIR.mkdir(exist_ok=True)
 
+# Marker of successful steps in the client output (UTF-8)
+CHECK_MARK = "✓".encode()
+
+# Inference rows are written to the scenario CSV in batches of this size
+CSV_FLUSH_ROWS = 64
+
 # Simulation parameters
 SIMULATION_SCENARIOS = [
     # Scenario 1: No delays (baseline)
@@ -162,6 +196,34 @@ SIMULATION_SCENARIOS = [
     },
 ]
 
+# Scenario configs as saved next to their results, serialized once
+SCENARIO_CONFIG_JSON = {scenario['name']: json.dumps(scenario, indent=2).encode() for scenario in SIMULATION_SCENARIOS}
+
+
+if WATCHDOG_AVAILABLE:
+    class InferenceFileHandler(FileSystemEventHandler):
+        """Records an inference each time the server rewrites the device times file (once per result)"""
+        def __init__(self, runner):
+            self.runner = runner
+            self.last_mtime = None
+
+        def on_modified(self, event):
+            if Path(event.src_path) != DEVICE_TIMES_FILE:
+                return
+            # A single rewrite can raise several events (truncate, write); record it only once
+            try:
+                mtime = os.stat(DEVICE_TIMES_FILE).st_mtime_ns
+            except OSError:
+                return
+            if mtime == self.last_mtime:
+                return
+            # The edge file may be mid-rewrite by the server; retry the read briefly
+            for _ in range(5):
+                if self.runner._check_and_record_new_inferences():
+                    self.last_mtime = mtime
+                    return
+                time.sleep(0.01)
+
 
 class SimulationRunner:
     def __init__(self):
@@ -174,60 +236,99 @@ class SimulationRunner:
         self.inference_count = 0
         self.csv_file = None
         self.csv_writer = None
+        # Rows not yet written to csv_file; shared by the monitor threads, hence the lock
+        self._row_buffer = []
+        self._csv_lock = threading.Lock()
+        # Keep-alive session for the readiness probes, so each server start costs one TCP handshake
+        self._probe_session = requests.Session()
+        self._probe_session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4))
+        # Parsed config files by path, kept in sync with what we write; dropped on restore
+        self._config_cache = {}
+        # Client config YAML per (scenario name, client index), rendered once; last text written per path
+        self._client_configs = None
+        self._written_config = {}
+        # (mtime, parsed content) of the server data files, reparsed only when they change
+        self._json_cache = {}
+        # 'device'/'edge' -> (keys, 'layer_*' keys) of the last times dict seen
+        self._layer_keys = {}
         
     def backup_config(self, filepath):
         """Backup a configuration file"""
         backup_path = f"{filepath}.backup"
         if Path(filepath).exists():
-            with open(filepath, 'r') as f:
-                content = f.read()
-            with open(backup_path, 'w') as f:
-                f.write(content)
+            shutil.copyfile(filepath, backup_path)
         return backup_path
     
     def restore_config(self, filepath, backup_path):
-        """Restore a configuration file from backup"""
+        """Restore a configuration file from backup (atomic rename, which also removes the backup)"""
         if Path(backup_path).exists():
-            with open(backup_path, 'r') as f:
-                content = f.read()
-            with open(filepath, 'w') as f:
-                f.write(content)
-            os.remove(backup_path)
+            os.replace(backup_path, filepath)
+        self._config_cache.pop(str(filepath), None)
+        self._written_config.pop(str(filepath), None)
     
-    def update_client_config(self, scenario, client_index=0):
-        """Update client configuration for scenario"""
-        with open(CLIENT_CONFIG_FILE, 'r') as f:
-            config = yaml.safe_load(f)
+    def _load_config(self, filepath):
+        """Parsed config file, read from disk only the first time after a restore"""
+        key = str(filepath)
+        if key not in self._config_cache:
+            with open(filepath, 'r') as f:
+                self._config_cache[key] = yaml.load(f, Loader=YamlLoader)
+        return self._config_cache[key]
+    
+    def _write_config(self, filepath, config):
+        """Dump a (cached) config back to its file"""
+        with open(filepath, 'w') as f:
+            yaml.dump(config, f, Dumper=YamlDumper, default_flow_style=False)
+    
+    @staticmethod
+    def _render_client_config(base_config, scenario, client_index):
+        """YAML text of the client configuration for one client of a scenario"""
+        config = copy.deepcopy(base_config)
         
         # Set client ID (null for first, fixed for others)
-        if client_index == 0:
-            config['client']['client_id'] = None  # Auto-generate
-        else:
-            config['client']['client_id'] = f"sim_client_{client_index}"
+        config['client']['client_id'] = None if client_index == 0 else f"sim_client_{client_index}"  # None: auto-generate
         
         # Update delay simulation
         config['delay_simulation'] = {
             'computation': scenario['computation_delay'],
             'network': scenario['network_delay']
         }
-        
-        with open(CLIENT_CONFIG_FILE, 'w') as f:
-            yaml.dump(config, f, default_flow_style=False)
+        return yaml.dump(config, Dumper=YamlDumper, default_flow_style=False)
+    
+    def update_client_config(self, scenario, client_index=0):
+        """Update client configuration for scenario"""
+        if self._client_configs is None:
+            # Render every scenario's client configs once, from the original (restored) file
+            base_config = self._load_config(CLIENT_CONFIG_FILE)
+            self._client_configs = {
+                (s['name'], i): self._render_client_config(base_config, s, i)
+                for s in SIMULATION_SCENARIOS for i in range(s['num_clients'])
+            }
+        
+        text = self._client_configs.get((scenario['name'], client_index))
+        if text is None:  # scenario not from SIMULATION_SCENARIOS
+            text = self._render_client_config(self._load_config(CLIENT_CONFIG_FILE), scenario, client_index)
+        
+        # The file already holds this configuration, nothing to write
+        if self._written_config.get(str(CLIENT_CONFIG_FILE)) == text:
+            return
+        CLIENT_CONFIG_FILE.write_text(text)
+        self._written_config[str(CLIENT_CONFIG_FILE)] = text
     
     def update_server_config(self, scenario):
         """Update server configuration for scenario"""
-        with open(SERVER_SETTINGS_FILE, 'r') as f:
-            config = yaml.safe_load(f)
+        config = self._load_config(SERVER_SETTINGS_FILE)
         
         # Disable server-side delays for cleaner client measurements
         if 'delay_simulation' not in config:
             config['delay_simulation'] = {}
         
+        disabled = {'enabled': False}
+        if config['delay_simulation'].get('computation') == disabled and config['delay_simulation'].get('network') == disabled:
+            return
+        
         config['delay_simulation']['computation'] = {'enabled': False}
         config['delay_simulation']['network'] = {'enabled': False}
-        
-        with open(SERVER_SETTINGS_FILE, 'w') as f:
-            yaml.dump(config, f, default_flow_style=False)
+        self._write_config(SERVER_SETTINGS_FILE, config)
     
     def start_server(self):
         """Start the edge server"""
@@ -251,7 +352,7 @@ class SimulationRunner:
         max_wait = 15
         for i in range(max_wait):
             try:
-                response = requests.get(f"http://{self.server_host}:{self.server_port}/docs", timeout=1)
+                response = self._probe_session.get(f"http://{self.server_host}:{self.server_port}/docs", timeout=1)
                 if response.status_code == 200:
                     print(f"✓ Server ready after {i+1} seconds")
                     return True
@@ -261,6 +362,25 @@ class SimulationRunner:
         print("⚠ Server may not be ready, proceeding anyway")
         return False
     
+    def reload_server(self):
+        """Have the running server reload settings.yaml and reset; start a new one if there is none or it fails"""
+        if self.server_process and self.server_process.poll() is None:
+            print("\n🔄 Reloading server configuration...")
+            try:
+                # The server re-measures its edge inference times before answering
+                response = self._probe_session.post(
+                    f"http://{self.server_host}:{self.server_port}{SERVER_RELOAD_ENDPOINT}", timeout=60)
+                if response.status_code == 200:
+                    print("✓ Server configuration reloaded")
+                    return True
+            except requests.exceptions.RequestException:
+                pass
+            print("⚠ Reload failed, restarting server")
+            self.stop_server()
+        ready = self.start_server()
+        time.sleep(3)  # Extra time for server initialization
+        return ready
+    
     def stop_server(self):
         """Stop the edge server"""
         if self.server_process:
@@ -271,6 +391,8 @@ class SimulationRunner:
             except subprocess.TimeoutExpired:
                 self.server_process.kill()
             self.server_process = None
+            # Connections to the stopped server are dead; the session reconnects on the next probe
+            self._probe_session.close()
     
     def _monitor_server_output(self):
         """Monitor server output for inference events"""
@@ -290,80 +412,115 @@ class SimulationRunner:
         # We'll also check files for more reliable data
         pass
     
+    def _read_json(self, filepath):
+        """Parsed JSON file, reusing the last parse while its mtime is unchanged"""
+        mtime = os.stat(filepath).st_mtime_ns
+        cached = self._json_cache.get(filepath)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(filepath, 'rb') as f:
+            data = json_loads(f.read())
+        self._json_cache[filepath] = (mtime, data)
+        return data
+    
     def _check_and_record_new_inferences(self):
         """Check server data files and record any new inferences"""
         try:
             # Read current device inference times
-            device_file = SCRIPT_DIR / "src" / "server" / "device_inference_times.json"
-            edge_file = SCRIPT_DIR / "src" / "server" / "edge_inference_times.json"
-            
-            if device_file.exists() and edge_file.exists():
-                with open(device_file, 'r') as f:
-                    device_times = json.load(f)
-                with open(edge_file, 'r') as f:
-                    edge_times = json.load(f)
+            if DEVICE_TIMES_FILE.exists() and EDGE_TIMES_FILE.exists():
+                device_times = self._read_json(DEVICE_TIMES_FILE)
+                edge_times = self._read_json(EDGE_TIMES_FILE)
                 
                 # Record inference data
                 self._record_inference(device_times, edge_times)
+                return True
         except Exception as e:
             pass  # Silently ignore errors during monitoring
+        return False
+    
+    def _layer_values(self, times, side):
+        """Numeric per-layer times as an array; the layer keys are only re-selected when the keys change"""
+        keys = tuple(times)
+        cached = self._layer_keys.get(side)
+        if cached is None or cached[0] != keys:
+            cached = self._layer_keys[side] = (keys, [k for k in keys if k.startswith('layer_')])
+        # values are checked on every call: a layer may hold None or a non-numeric value
+        values = [v for v in map(times.__getitem__, cached[1]) if isinstance(v, (int, float))]
+        return np.array(values, dtype=np.float64)
     
     def _record_inference(self, device_times, edge_times):
-        """Record a single inference to CSV"""
-        if not self.csv_writer:
-            return
-        
-        self.inference_count += 1
-        
+        """Record a single inference to CSV (buffered, see CSV_FLUSH_ROWS)"""
         # Calculate statistics
-        device_values = [v for k, v in device_times.items() if k.startswith('layer_') and isinstance(v, (int, float))]
-        edge_values = [v for k, v in edge_times.items() if k.startswith('layer_') and isinstance(v, (int, float))]
+        device_values = self._layer_values(device_times, 'device')
+        edge_values = self._layer_values(edge_times, 'edge')
         
-        row = {
-            'inference_id': self.inference_count,
-            'timestamp': datetime.now().isoformat(),
-            'avg_device_time': sum(device_values) / len(device_values) if device_values else 0,
-            'min_device_time': min(device_values) if device_values else 0,
-            'max_device_time': max(device_values) if device_values else 0,
-            'avg_edge_time': sum(edge_values) / len(edge_values) if edge_values else 0,
-            'min_edge_time': min(edge_values) if edge_values else 0,
-            'max_edge_time': max(edge_values) if edge_values else 0,
-            'num_device_layers': len(device_values),
-            'num_edge_layers': len(edge_values),
-        }
-        
-        self.csv_writer.writerow(row)
-        self.csv_file.flush()  # Ensure data is written immediately
+        with self._csv_lock:
+            if not self.csv_writer:
+                return
+            
+            self.inference_count += 1
+            
+            row = {
+                'inference_id': self.inference_count,
+                'timestamp': datetime.now().isoformat(),
+                'avg_device_time': float(device_values.mean()) if device_values.size else 0,
+                'min_device_time': float(device_values.min()) if device_values.size else 0,
+                'max_device_time': float(device_values.max()) if device_values.size else 0,
+                'avg_edge_time': float(edge_values.mean()) if edge_values.size else 0,
+                'min_edge_time': float(edge_values.min()) if edge_values.size else 0,
+                'max_edge_time': float(edge_values.max()) if edge_values.size else 0,
+                'num_device_layers': device_values.size,
+                'num_edge_layers': edge_values.size,
+            }
+            
+            self._row_buffer.append(row)
+            if len(self._row_buffer) >= CSV_FLUSH_ROWS:
+                self._flush_rows()
+    
+    def _flush_rows(self):
+        """Write the buffered rows to the scenario CSV (caller holds _csv_lock)"""
+        if self._row_buffer:
+            self.csv_writer.writerows(self._row_buffer)
+            self._row_buffer.clear()
+            self.csv_file.flush()
     
     def start_client(self, client_index=0):
         """Start a client and monitor its output"""
         print(f"  Starting client {client_index}...")
         client_script = CLIENT_DIR / "http_client.py"
         
-        process = subprocess.Popen(
-            [sys.executable, str(client_script)],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            cwd=str(CLIENT_DIR)
-        )
-        
-        # Start monitoring thread
-        monitor_thread = threading.Thread(
-            target=self._monitor_client_output,
-            args=(process, client_index),
-            daemon=True
-        )
-        monitor_thread.start()
+        if WATCHDOG_AVAILABLE:
+            # Inferences are recorded from the server's data file (InferenceFileHandler),
+            # so the client output is neither parsed nor piped
+            process = subprocess.Popen(
+                [sys.executable, str(client_script)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                cwd=str(CLIENT_DIR)
+            )
+        else:
+            process = subprocess.Popen(
+                [sys.executable, str(client_script)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                cwd=str(CLIENT_DIR)
+            )
+            
+            # Start monitoring thread
+            monitor_thread = threading.Thread(
+                target=self._monitor_client_output,
+                args=(process, client_index),
+                daemon=True
+            )
+            monitor_thread.start()
         
         self.client_processes.append(process)
         return process
     
     def _monitor_client_output(self, process, client_index):
-        """Monitor client output for inference completion"""
+        """Monitor client output for inference completion (raw bytes, nothing is decoded)"""
         for line in process.stdout:
-            if "Inference complete" in line or "✓" in line:
+            if b"Inference complete" in line or CHECK_MARK in line:
                 # Inference completed, check and record
                 self._check_and_record_new_inferences()
     
@@ -381,11 +538,12 @@ class SimulationRunner:
     def create_scenario_folder(self, scenario):
         """Create CSV file for scenario results in main results folder"""
         self.inference_count = 0
+        self._layer_keys = {}
         
         # Create CSV file with scenario name prefix in main folder
         csv_filename = f"{scenario['name']}_inference_results.csv"
         csv_path = self.current_results_folder / csv_filename
-        self.csv_file = open(csv_path, 'w', newline='')
+        self.csv_file = open(csv_path, 'w', newline='', buffering=1 << 16)
         
         fieldnames = [
             'inference_id',
@@ -407,17 +565,21 @@ class SimulationRunner:
         # Save scenario configuration in main folder
         config_filename = f"{scenario['name']}_scenario_config.json"
         config_path = self.current_results_folder / config_filename
-        with open(config_path, 'w') as f:
-            json.dump(scenario, f, indent=2)
+        config_json = SCENARIO_CONFIG_JSON.get(scenario['name'])
+        if config_json is None:  # scenario not from SIMULATION_SCENARIOS
+            config_json = json.dumps(scenario, indent=2).encode()
+        config_path.write_bytes(config_json)
         
         print(f"\n📝 Recording {scenario['name']} results to: {csv_filename}")
     
     def close_scenario_folder(self):
         """Close current scenario CSV file"""
-        if self.csv_file:
-            self.csv_file.close()
-            self.csv_file = None
-            self.csv_writer = None
+        with self._csv_lock:
+            if self.csv_file:
+                self._flush_rows()
+                self.csv_file.close()
+                self.csv_file = None
+                self.csv_writer = None
         self.current_scenario_dir = None
     
     
@@ -429,16 +591,12 @@ class SimulationRunner:
         }
         
         # Read device inference times
-        device_file = SCRIPT_DIR / "src" / "server" / "device_inference_times.json"
-        if device_file.exists():
-            with open(device_file, 'r') as f:
-                stats['device_inference_times'] = json.load(f)
+        if DEVICE_TIMES_FILE.exists():
+            stats['device_inference_times'] = self._read_json(DEVICE_TIMES_FILE)
         
         # Read edge inference times
-        edge_file = SCRIPT_DIR / "src" / "server" / "edge_inference_times.json"
-        if edge_file.exists():
-            with open(edge_file, 'r') as f:
-                stats['edge_inference_times'] = json.load(f)
+        if EDGE_TIMES_FILE.exists():
+            stats['edge_inference_times'] = self._read_json(EDGE_TIMES_FILE)
         
         return stats
     
@@ -463,9 +621,8 @@ class SimulationRunner:
             # Update configurations
             self.update_server_config(scenario)
             
-            # Start server
-            self.start_server()
-            time.sleep(3)  # Extra time for server initialization
+            # Start the server, or reset the one kept from the previous scenario
+            self.reload_server()
             
             # Start clients
             for i in range(scenario['num_clients']):
@@ -475,10 +632,21 @@ class SimulationRunner:
             
             # Monitor and record inferences during simulation
             print(f"\n⏳ Running for {scenario['duration_seconds']} seconds...")
-            start_time = time.time()
-            while time.time() - start_time < scenario['duration_seconds']:
-                time.sleep(2)  # Check every 2 seconds
-                self._check_and_record_new_inferences()
+            if WATCHDOG_AVAILABLE:
+                # Inferences are recorded from file events as they happen
+                observer = Observer()
+                observer.schedule(InferenceFileHandler(self), str(DEVICE_TIMES_FILE.parent), recursive=False)
+                observer.start()
+                try:
+                    time.sleep(scenario['duration_seconds'])
+                finally:
+                    observer.stop()
+                    observer.join()
+            else:
+                start_time = time.time()
+                while time.time() - start_time < scenario['duration_seconds']:
+                    time.sleep(2)  # Check every 2 seconds
+                    self._check_and_record_new_inferences()
             
             # Stop clients
             self.stop_clients()
@@ -489,22 +657,19 @@ class SimulationRunner:
             
             print(f"\n✓ Scenario '{scenario['name']}' completed with {self.inference_count} inferences")
             
-            # Stop server
-            self.stop_server()
-            time.sleep(3)  # Wait for cleanup
-            
         except Exception as e:
             print(f"\n❌ Error in scenario '{scenario['name']}': {e}")
             import traceback
             traceback.print_exc()
+            # Do not carry a server in an unknown state into the next scenario
+            self.stop_server()
         
         finally:
             # Close scenario folder
             self.close_scenario_folder()
             
-            # Cleanup
+            # Cleanup (the server is kept running for the next scenario)
             self.stop_clients()
-            self.stop_server()
             
             # Restore configurations
             self.restore_config(CLIENT_CONFIG_FILE, client_backup)
@@ -527,6 +692,8 @@ class SimulationRunner:
             print(f"\n\n[{i}/{len(SIMULATION_SCENARIOS)}]")
             self.run_scenario(scenario)
         
+        self.stop_server()
+        
         # Print summary
         print("\n" + "="*80)
         print("✅ All simulations completed!")
@@ -1,12 +1,36 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict
 from server.communication.request_handler import RequestHandler
 from server.logger.log import logger
-import ntplib
-import threading
-import time
+from server.communication.ntp_clock import get_clock
 import traceback
 import sys
 
+# Try to import orjson for faster response serialization
+try:
+    import orjson
+
+    class DefaultResponse(JSONResponse):
+        """JSON response serialized with orjson (FastAPI's own ORJSONResponse is deprecated)"""
+
+        def render(self, content) -> bytes:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    DefaultResponse = JSONResponse
+
+# Seconds an idle client connection is kept open for reuse
+KEEP_ALIVE_TIMEOUT = 75
+
+
+class RegistrationRequest(BaseModel):
+    """Body of the registration endpoint"""
+    # numeric ids are accepted as before and turned into strings
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    device_id: str
+
+
 class HttpServer:
     def __init__(
         self,
@@ -19,48 +43,44 @@ class HttpServer:
         last_offloading_layer: int,
         request_handler: RequestHandler
     ):
-        self.app = FastAPI()
+        self.app = FastAPI(default_response_class=DefaultResponse)
         self.host = host
         self.port = port
         self.endpoints = endpoints
 
         self.devices = set()
+        # X-Image-Hash of the last stored input per device, so unchanged images need not be resent
+        self.input_hashes = {}
 
         # Set up model
         self.input_height = input_height
         self.input_width = input_width
+        self.last_offloading_layer = last_offloading_layer
         self.best_offloading_layer = last_offloading_layer
 
         # Set up request handler
         self.request_handler = request_handler
 
-        # Set up NTP client
-        self.ntp_client = ntplib.NTPClient()
-        self.ntp_server = ntp_server
-        self.offset = self._sync_with_ntp()
-        self.start_timestamp = self._get_current_time()
+        # NTP clock shared with the other servers syncing to the same NTP server
+        self.clock = get_clock(ntp_server)
+        self.start_timestamp = self.clock.now()
         self._setup_routes()
 
-    def _sync_with_ntp(self) -> float:
-        ntp_timestamp = None
-        while ntp_timestamp is None:
-            try:
-                response = self.ntp_client.request(self.ntp_server)
-                # Get the offset between local clock time and ntp server time (seconds since 1900)
-                offset = response.offset
-                return offset
-            except ntplib.NTPException as _:
-                continue
-        threading.Timer(600, self.sync_with_ntp).start()
-
-    def _get_current_time(self) -> float:
-        return time.time() + self.offset
+    @staticmethod
+    def _offloading_layer_headers(offloading_layer_index: int) -> dict:
+        """The current offloading decision, sent with device_input responses"""
+        return {'X-Offloading-Layer': str(offloading_layer_index)}
 
     def _setup_routes(self):
+        # Fixed for the server's lifetime: bound once here instead of looked up on self per request
+        request_handler = self.request_handler
+        now = self.clock.now
+        input_height, input_width = self.input_height, self.input_width
+
         @self.app.post(self.endpoints['registration'])
-        async def registration(data: dict):
+        async def registration(data: RegistrationRequest):
             try:
-                cleaned_device_id = self.request_handler.handle_registration(data["device_id"])
+                cleaned_device_id = request_handler.handle_registration(data.device_id)
                 self.devices.add(cleaned_device_id)
                 return {'message': 'Success', 'device': cleaned_device_id}
             except Exception as e:
@@ -68,11 +88,26 @@ class HttpServer:
                 raise HTTPException(status_code=500, detail=str(e))
 
         @self.app.post(self.endpoints['device_input'])
-        async def device_input(request: Request):
+        async def device_input(request: Request, response: Response):
             try:
                 body = await request.body()  # Reads raw bytes
-                self.request_handler.handle_device_input(body, self.input_height, self.input_width)
-                return {'message': 'Success'}
+                image_hash = request.headers.get('x-image-hash')
+                # Devices identify themselves with X-Device-Id; the client address stands in otherwise
+                device_id = request.headers.get('x-device-id') or (request.client.host if request.client else None)
+                # The current offloading decision rides along, saving a separate offloading_layer request
+                offloading_layer_index = request_handler.handle_offloading_layer(best_offloading_layer=self.best_offloading_layer)
+                if not body and image_hash:
+                    # Hash-only request: 304 if we already hold that image, otherwise ask for the bytes.
+                    # The simulated network delay applies once per upload, as for a full one (keeping
+                    # scenarios comparable); after a 412 it is applied to the resent image instead
+                    if image_hash == self.input_hashes.get(device_id):
+                        request_handler.apply_network_delay()
+                        return Response(status_code=304, headers=self._offloading_layer_headers(offloading_layer_index))
+                    return Response(status_code=412)
+                request_handler.handle_device_input(body, input_height, input_width)
+                self.input_hashes[device_id] = image_hash
+                response.headers.update(self._offloading_layer_headers(offloading_layer_index))
+                return {'message': 'Success', 'offloading_layer_index': offloading_layer_index}
             except Exception as e:
                 print(f"ERROR in device_input endpoint: {type(e).__name__}: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
@@ -80,9 +115,9 @@ class HttpServer:
         @self.app.post(self.endpoints['device_inference_result'])
         async def device_inference_result(request: Request):
             try:
-                received_timestamp = self._get_current_time()
+                received_timestamp = now()
                 body = await request.body()  # Reads raw bytes
-                self.best_offloading_layer = self.request_handler.handle_device_inference_result(body=body, received_timestamp=received_timestamp)
+                self.best_offloading_layer = request_handler.handle_device_inference_result(body=body, received_timestamp=received_timestamp)
                 return {'message': 'Success'}
             except Exception as e:
                 error_msg = f"ERROR in device_inference_result endpoint: {type(e).__name__}: {e}"
@@ -94,16 +129,33 @@ class HttpServer:
         @self.app.get(self.endpoints['offloading_layer'])
         async def offloading_layer():
             try:
-                cleaned_offloading_layer_index = self.request_handler.handle_offloading_layer(best_offloading_layer=self.best_offloading_layer)
+                cleaned_offloading_layer_index = request_handler.handle_offloading_layer(best_offloading_layer=self.best_offloading_layer)
                 return {'offloading_layer_index': cleaned_offloading_layer_index}
             except Exception as e:
                 print(f"ERROR in offloading_layer endpoint: {type(e).__name__}: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
 
+        @self.app.post(self.endpoints.get('reload_config', '/api/reload_config'))
+        async def reload_config():
+            # Start over with the current settings.yaml without restarting the process
+            try:
+                request_handler.reload(input_height, input_width)
+                self.devices.clear()
+                self.input_hashes.clear()
+                self.best_offloading_layer = self.last_offloading_layer
+                return {'message': 'Success'}
+            except Exception as e:
+                print(f"ERROR in reload_config endpoint: {type(e).__name__}: {e}")
+                raise HTTPException(status_code=500, detail=str(e))
+
     def run(self):
         import uvicorn
+        # http/loop stay on "auto": httptools and uvloop are used when installed.
+        # Idle keep-alive connections are held open well beyond the 5s default, so clients
+        # pausing between inferences (e.g. under simulated delays) reuse their connection
         uvicorn.run(
             self.app,
             host=self.host,
-            port=self.port
+            port=self.port,
+            timeout_keep_alive=KEEP_ALIVE_TIMEOUT
         )
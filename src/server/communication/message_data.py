@@ -1,9 +1,82 @@
 import os
+import csv
+import atexit
+import threading
 from dataclasses import dataclass
-import pandas as pd
+
+import numpy as np
 
 from server.logger.log import logger
 
+# Pending evaluation rows are flushed to disk once this many accumulate,
+# or at most FLUSH_INTERVAL seconds after the first of them was written
+FLUSH_ROWS = 64
+FLUSH_INTERVAL = 1.0
+
+
+class _CsvAppender:
+    """Evaluation file kept open for appending, with its csv writer and batched flushing"""
+
+    def __init__(self, file_path: str, header: list):
+        file_exists = os.path.isfile(file_path)
+        self.file = open(file_path, 'a', newline='', buffering=1 << 16)
+        self.writer = csv.writer(self.file, lineterminator='\n')
+        # rows are written from the server threads and flushed from the timer thread
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.timer = None
+        if not file_exists:
+            self.writer.writerow(header)
+        atexit.register(self.close)
+
+    def writerow(self, row):
+        with self.lock:
+            self.writer.writerow(row)
+            self.pending += 1
+            if self.pending >= FLUSH_ROWS:
+                self._flush()
+            elif self.timer is None:
+                self.timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.pending:
+            self.file.flush()
+            self.pending = 0
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.file.close()
+
+
+# Evaluation files kept open for appending: {file_path: _CsvAppender}
+_CSV_WRITERS = {}
+
+
+def _plain(value):
+    """numpy arrays (and those nested in dicts) as lists, so CSV rows hold every value instead of a truncated repr"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    return value
+
+
+def _get_csv_writer(file_path: str, header: list) -> _CsvAppender:
+    """Open file_path for appending once (writing header if it is new) and reuse the writer"""
+    if file_path not in _CSV_WRITERS:
+        _CSV_WRITERS[file_path] = _CsvAppender(file_path, header)
+    return _CSV_WRITERS[file_path]
+
 
 @dataclass
 class MessageData:
@@ -24,17 +97,13 @@ class MessageData:
     device_layers_inference_time = None
 
     def to_dict(self):
-        return self.__dict__
+        return {k: _plain(v) for k, v in self.__dict__.items()}
 
     @staticmethod
     def save_to_file(file_path: str, data_dict: dict):
-        # check if the file already exists
-        file_exists = os.path.isfile(file_path)
         try:
-            # create a DataFrame from the data dictionary
-            df = pd.DataFrame.from_dict([data_dict])
-            # append to the CSV file; write header only if file does not exist
-            df.to_csv(file_path, mode='a', header=not file_exists, index=False)
+            # append to the CSV file; header is written only if the file did not exist
+            _get_csv_writer(file_path, list(data_dict)).writerow(data_dict.values())
             logger.debug(f"Data saved to {file_path}")
         except Exception as e:
             logger.error(f"Failed to save data to {file_path}: {e}")
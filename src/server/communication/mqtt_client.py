@@ -1,17 +1,34 @@
 import json
 import random
-import time
 
-import ntplib
 import paho.mqtt.client as mqtt
 import threading
 import queue
 
 from server.logger.log import logger
 from server.communication.request_handler import RequestHandler
+from server.communication.ntp_clock import get_clock
+
+# Try to import orjson for faster message parsing and encoding
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps  # bytes, which paho publishes as they are
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
 
 
 class MqttClient:
+    # Fixed attribute set: no per-instance __dict__, faster attribute access on the message path
+    __slots__ = (
+        'broker_url', 'broker_port', 'client_id', 'client',
+        'subscribed_topics', 'offloading_layer_topic', '_dispatch',
+        'ntp_server', 'clock', 'start_timestamp',
+        'input_height', 'input_width', 'best_offloading_layer',
+        'request_handler', 'task_queues', 'threads',
+    )
+
     def __init__(
             self,
             broker_url: str,
@@ -38,11 +55,17 @@ class MqttClient:
 
         # Set up topics
         self.subscribed_topics = subscribed_topics
-
-        # Set up NTP client
-        self.ntp_client = ntplib.NTPClient()
+        self.offloading_layer_topic = subscribed_topics['offloading_layer']
+        # Incoming topic -> handler, looked up once per message
+        self._dispatch = {
+            subscribed_topics['device_inference_result']: self._on_device_inference_result,
+            subscribed_topics['device_input']: self._on_device_input,
+            subscribed_topics['registration']: self._on_registration,
+        }
+
+        # NTP clock shared with the other servers syncing to the same NTP server
         self.ntp_server = ntp_server
-        self.offset = self.sync_with_ntp()
+        self.clock = get_clock(ntp_server)
         self.start_timestamp = self.get_current_time()
 
         # Set up model
@@ -53,10 +76,13 @@ class MqttClient:
         # Set up request handler
         self.request_handler = request_handler
 
-        # Set up helper thread
-        self.task_queue = queue.Queue()
-        self.thread = threading.Thread(target=self._worker, daemon=True)
-        self.thread.start()
+        # Set up helper threads: one queue and worker per incoming topic, so a slow inference
+        # result does not hold up registrations and input frames (order is kept within a topic)
+        self.task_queues = {topic: queue.Queue() for topic in self._dispatch}
+        self.threads = [threading.Thread(target=self._worker, args=(task_queue,), daemon=True)
+                        for task_queue in self.task_queues.values()]
+        for thread in self.threads:
+            thread.start()
 
     @staticmethod
     def create_random_payload():
@@ -96,55 +122,53 @@ class MqttClient:
         else:
             logger.debug(f"Connection failed with code {rc}")
     
-    def sync_with_ntp(self) -> float:
-        ntp_timestamp = None
-        while ntp_timestamp is None:
-            try:
-                response = self.ntp_client.request(self.ntp_server)
-                # Get the offset between local clock time and ntp server time (seconds since 1900)
-                offset = response.offset
-                logger.debug(f"Synchronized with NTP server. Offset: {offset} seconds")
-                return offset
-            except ntplib.NTPException as _:
-                continue
-        threading.Timer(600, self.sync_with_ntp).start()
-
     def get_current_time(self) -> float:
-        return time.time() + self.offset
+        return self.clock.now()
     
-    def _worker(self):
+    @staticmethod
+    def _worker(task_queue: queue.Queue):
         while True:
-            task = self.task_queue.get()
+            task = task_queue.get()
             task()
-            self.task_queue.task_done()
+            task_queue.task_done()
 
     def on_message(self, client, userdata, message):
         received_timestamp = self.get_current_time()
+        task_queue = self.task_queues.get(message.topic)
+        if task_queue is None:
+            return
 
         def task():
             self.handle_message_task(message, received_timestamp)
 
-        self.task_queue.put(task)   # Submit the task to the worker thread queue
+        task_queue.put(task)   # Submit the task to the worker thread queue of its topic
 
     def handle_message_task(self, message, received_timestamp):
-        if message.topic == self.subscribed_topics['device_inference_result']:  # Updates device time, runs offloading algorithm and sends best offloading layer
-            logger.debug('Device inference result received')
-            self.best_offloading_layer = self.request_handler.handle_device_inference_result(body=message.payload, received_timestamp=received_timestamp)
-            cleaned_offloading_layer_index = self.request_handler.handle_offloading_layer(best_offloading_layer=self.best_offloading_layer)
-            message_data = {'offloading_layer_index': cleaned_offloading_layer_index}
-            self.publish(self.subscribed_topics['offloading_layer'], json.dumps(message_data))
-            logger.debug('Best offloading layer sent')
-        elif message.topic == self.subscribed_topics['device_input']: # Save input image
-            logger.debug('Device input received')
-            self.request_handler.handle_device_input(message.payload, self.input_height, self.input_width)
-            logger.debug('Device input saved')
-        elif message.topic == self.subscribed_topics['registration']: # Sends best offloading layer
-            logger.debug('Registration request received')
-            decoded_payload = message.payload.decode()
-            json_data = json.loads(decoded_payload)
-            cleaned_device_id = self.request_handler.handle_registration(json_data["device_id"])
-            cleaned_offloading_layer_index = self.request_handler.handle_offloading_layer(best_offloading_layer=self.best_offloading_layer)
-            message_data = {'offloading_layer_index': cleaned_offloading_layer_index}
-            self.publish(self.subscribed_topics['offloading_layer'], json.dumps(message_data))
-            logger.debug('Best offloading layer sent')
-
+        handler = self._dispatch.get(message.topic)
+        if handler:
+            handler(message, received_timestamp)
+
+    def _on_device_inference_result(self, message, received_timestamp):
+        # Updates device time, runs offloading algorithm and sends best offloading layer
+        logger.debug('Device inference result received')
+        self.best_offloading_layer = self.request_handler.handle_device_inference_result(body=message.payload, received_timestamp=received_timestamp)
+        cleaned_offloading_layer_index = self.request_handler.handle_offloading_layer(best_offloading_layer=self.best_offloading_layer)
+        message_data = {'offloading_layer_index': cleaned_offloading_layer_index}
+        self.publish(self.offloading_layer_topic, json_dumps(message_data))
+        logger.debug('Best offloading layer sent')
+
+    def _on_device_input(self, message, received_timestamp):
+        # Save input image
+        logger.debug('Device input received')
+        self.request_handler.handle_device_input(message.payload, self.input_height, self.input_width)
+        logger.debug('Device input saved')
+
+    def _on_registration(self, message, received_timestamp):
+        # Sends best offloading layer
+        logger.debug('Registration request received')
+        json_data = json_loads(message.payload)
+        cleaned_device_id = self.request_handler.handle_registration(json_data["device_id"])
+        cleaned_offloading_layer_index = self.request_handler.handle_offloading_layer(best_offloading_layer=self.best_offloading_layer)
+        message_data = {'offloading_layer_index': cleaned_offloading_layer_index}
+        self.publish(self.offloading_layer_topic, json_dumps(message_data))
+        logger.debug('Best offloading layer sent')
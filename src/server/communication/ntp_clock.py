@@ -0,0 +1,89 @@
+import threading
+import time
+
+import ntplib
+
+# Bounds of the resync interval (seconds), as NTP's own minpoll/maxpoll of 2^6 and 2^10
+MIN_POLL_INTERVAL = 64
+MAX_POLL_INTERVAL = 1024
+# Offset change (seconds) between two syncs below which the clock counts as stable
+STABLE_OFFSET_CHANGE = 0.005
+# Longest the constructor waits for the first sync (seconds) before leaving it to the background
+INITIAL_SYNC_TIMEOUT = 5
+
+
+class NtpClock:
+    """Local clock corrected by the offset to an NTP server.
+
+    Servers get theirs through get_clock(), so the HTTP, websocket and MQTT servers
+    share one clock (and one sync thread) per NTP server.
+
+    The first sync runs in the constructor, for at most INITIAL_SYNC_TIMEOUT seconds,
+    so timestamps taken right after startup are already corrected. If the server does
+    not answer in time, the offset is 0 until a background retry succeeds. Afterwards
+    the offset is refreshed periodically in a background thread:
+    the interval doubles (up to MAX_POLL_INTERVAL) while the offset is stable
+    and halves (down to MIN_POLL_INTERVAL) when it drifts.
+
+    Args:
+        ntp_server: The NTP server to sync with.
+    """
+
+    def __init__(self, ntp_server: str):
+        self.ntp_client = ntplib.NTPClient()
+        self.ntp_server = ntp_server
+        self.offset = 0.0
+        self._offset_ns = 0
+        self.poll_interval = MIN_POLL_INTERVAL
+        offset = self.sync_once(timeout=INITIAL_SYNC_TIMEOUT)
+        threading.Thread(target=self._periodic_sync, args=(offset,), daemon=True).start()
+
+    def sync_once(self, timeout: float = None) -> float:
+        """Query the NTP server until it answers, store and return the new offset.
+
+        With a timeout, give up after that many seconds and return None.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # each request is bounded by ntplib's own 5 s timeout, or by what is left of ours
+            request_timeout = 5 if deadline is None else min(max(deadline - time.monotonic(), 0.1), 5)
+            try:
+                response = self.ntp_client.request(self.ntp_server, timeout=request_timeout)
+            except (ntplib.NTPException, OSError) as _:
+                if deadline is not None and time.monotonic() + 1 >= deadline:
+                    return None
+                time.sleep(1)
+                continue
+            # Offset between local clock and ntp server time, ((T2 - T1) + (T3 - T4)) / 2
+            # from the four request/response timestamps
+            self._offset_ns = int(response.offset * 1e9)
+            self.offset = response.offset
+            return response.offset
+
+    def _periodic_sync(self, offset: float = None):
+        if offset is None:
+            offset = self.sync_once()
+        while True:
+            time.sleep(self.poll_interval)
+            previous_offset, offset = offset, self.sync_once()
+            if abs(offset - previous_offset) < STABLE_OFFSET_CHANGE:
+                self.poll_interval = min(self.poll_interval * 2, MAX_POLL_INTERVAL)
+            else:
+                self.poll_interval = max(self.poll_interval // 2, MIN_POLL_INTERVAL)
+
+    def now(self) -> float:
+        """Current NTP-corrected time in seconds since the epoch"""
+        return (time.time_ns() + self._offset_ns) / 1e9
+
+
+# One clock per NTP server for the whole process, built on first use
+_clocks = {}
+_clocks_lock = threading.Lock()
+
+
+def get_clock(ntp_server: str) -> NtpClock:
+    """Return the process-wide NtpClock for ntp_server, creating it on first use"""
+    with _clocks_lock:
+        if ntp_server not in _clocks:
+            _clocks[ntp_server] = NtpClock(ntp_server)
+        return _clocks[ntp_server]
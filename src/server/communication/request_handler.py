@@ -1,6 +1,8 @@
+import os
 import json
 import yaml
 import random
+import threading
 from pathlib import Path
 import numpy as np
 from PIL import Image
@@ -22,6 +24,18 @@ from server.variance_detector import VarianceDetector
 
 import struct
 
+# Try to import orjson for faster parsing of the stats files
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Fixed head of a device inference result: timestamp, device id, message id,
+# offloading layer index and layer output size in bytes
+_RESULT_HEADER = struct.Struct('<d9s4siI')
+# Size in bytes of the layers inference times that follow the layer output
+_RESULT_TIMES_SIZE = struct.Struct('<i')
 
 def load_network_delay_config():
     """Load network delay configuration from settings.yaml"""
@@ -50,8 +64,15 @@ def load_local_inference_config():
 class RequestHandler():
     # Class-level variance detector (shared across all requests)
     variance_detector = VarianceDetector(window_size=10, variance_threshold=0.15)
+    # path -> (mtime, parsed JSON, its values as a list) of the offloading stats files, re-read only when a file changes
+    _stats_cache = {}
+    # Serializes the read-modify-write of the device inference times file across worker threads
+    _device_times_lock = threading.Lock()
     
     def __init__(self):
+        self._load_config()
+    
+    def _load_config(self):
         # Load network delay configuration
         network_delay_config = load_network_delay_config()
         self.network_delay = DelaySimulator(network_delay_config)
@@ -65,6 +86,16 @@ class RequestHandler():
         if self.local_inference_enabled:
             logger.info(f"Local inference mode enabled with probability {self.local_inference_probability:.0%}")
     
+    def reload(self, input_height, input_width):
+        """
+        Re-read settings.yaml and reset the inference statistics, as a server restart would,
+        so one server process can serve several simulation scenarios.
+        """
+        self._load_config()
+        RequestHandler.variance_detector.reset()
+        Edge.variance_detector.reset()
+        Edge.reset(input_height=input_height, input_width=input_width)   # re-measure edge inference times
+    
     def should_force_local_inference(self) -> bool:
         """
         Determine if this request should force local-only inference (no offloading).
@@ -84,55 +115,68 @@ class RequestHandler():
         
         return should_force
     
-    def handle_registration(self, device_id):
-        # Apply network delay before responding
+    def apply_network_delay(self):
+        """Sleep for the simulated network delay, if enabled"""
         if self.network_delay.enabled:
             delay = self.network_delay.apply_delay()
             logger.debug(f"Applied network delay: {delay*1000:.2f}ms")
+
+    def handle_registration(self, device_id):
+        # Apply network delay before responding
+        self.apply_network_delay()
         return device_id
 
     def handle_device_input(self, rgb565_image, height, width):
         # Apply network delay after receiving input
-        if self.network_delay.enabled:
-            delay = self.network_delay.apply_delay()
-            logger.debug(f"Applied network delay: {delay*1000:.2f}ms")
+        self.apply_network_delay()
         
         image_array = ModelInputConverter.convert_rgb565_to_nparray(rgb565_image, height, width)
         image = Image.fromarray(image_array, 'RGB')
-        image.save(InputDataFiles.input_data_file_path)
+        # fastest zlib level: the PNG is only shown on the dashboard, size barely matters
+        image.save(InputDataFiles.input_data_file_path, compress_level=1)
         return
     
     def handle_device_inference_result(self, body, received_timestamp):
         message_data = RequestHandler._from_raw('device_inference_result', body)
         message_data = RequestHandler._extend_message_data(message_data, received_timestamp, body)
-        with open(OffloadingDataFiles.data_file_path_device, 'r') as f:
-            device_inference_times = json.load(f)
+        with RequestHandler._device_times_lock:
+            # copy: the cached dict stays as it was on disk
+            device_inference_times = dict(RequestHandler._read_stats(OffloadingDataFiles.data_file_path_device))
         
-        # Update device inference times with exponential moving average (alpha=0.2)
-        alpha = 0.2  # Weight for new measurement
-        for l_id, inference_time in enumerate(message_data.device_layers_inference_time):
-            layer_key = f"layer_{l_id}"
-            if layer_key in device_inference_times:
-                # Smooth the time with existing history
-                device_inference_times[layer_key] = alpha * inference_time + (1 - alpha) * device_inference_times[layer_key]
-            else:
-                device_inference_times[layer_key] = inference_time
+            # Update device inference times with exponential moving average (alpha=0.2)
+            alpha = 0.2  # Weight for new measurement
+            # tolist() gives Python floats, which json can write back
+            for l_id, inference_time in enumerate(message_data.device_layers_inference_time.tolist()):
+                layer_key = f"layer_{l_id}"
+                if layer_key in device_inference_times:
+                    # Smooth the time with existing history
+                    device_inference_times[layer_key] = alpha * inference_time + (1 - alpha) * device_inference_times[layer_key]
+                else:
+                    device_inference_times[layer_key] = inference_time
             
-            # Track variance for this layer
-            RequestHandler.variance_detector.add_device_measurement(l_id, inference_time)
+                # Track variance for this layer
+                RequestHandler.variance_detector.add_device_measurement(l_id, inference_time)
         
-        with open(OffloadingDataFiles.data_file_path_device, 'w') as f:
-            json.dump(device_inference_times, f, indent=4)
+            if device_inference_times != RequestHandler._read_stats(OffloadingDataFiles.data_file_path_device):
+                with open(OffloadingDataFiles.data_file_path_device, 'w') as f:
+                    json.dump(device_inference_times, f, indent=4)
+            else:
+                # Unchanged times: only touch the file, every result must still show up as a
+                # modification (simulation_runner records one inference per modification)
+                os.utime(OffloadingDataFiles.data_file_path_device)
+            RequestHandler._stats_cache[OffloadingDataFiles.data_file_path_device] = (
+                os.stat(OffloadingDataFiles.data_file_path_device).st_mtime_ns,
+                device_inference_times, list(device_inference_times.values()))
         
         # Finish inference on edge (only if device didn't complete all layers)
         # When offloading_layer_index is -1 or LAST_LAYER, all inference was done on device
         if message_data.offloading_layer_index == -1 or message_data.offloading_layer_index >= 58:
             # All layers completed on device, no edge inference needed
-            prediction = np.array(message_data.layer_output, dtype=np.float32)
+            prediction = message_data.layer_output
             logger.debug(f"All layers completed on device (layer_index={message_data.offloading_layer_index})")
         else:
             # Continue inference on edge from where device stopped
-            prediction = Edge.run_inference(message_data.offloading_layer_index, np.array(message_data.layer_output, dtype=np.float32))
+            prediction = Edge.run_inference(message_data.offloading_layer_index, message_data.layer_output)
         
         logger.debug(f"Prediction: {prediction.tolist()}")
         MessageData.save_to_file(EvaluationFiles.evaluation_file_path, message_data.to_dict())
@@ -171,62 +215,57 @@ class RequestHandler():
         return best_offloading_layer
 
     @staticmethod
-    def _load_stats():
-        """ Loads the offloading stats from the JSON files """
-        with open(OffloadingDataFiles.data_file_path_device, 'r') as file:
-            device_inference_times = json.load(file)
-            device_inference_times = list({k: v for k, v in device_inference_times.items()}.values())
+    def _cached_stats(file_path) -> tuple:
+        """ (mtime, parsed content, values list) of a stats JSON file, cached until its modification time changes """
+        mtime = os.stat(file_path).st_mtime_ns
+        cached = RequestHandler._stats_cache.get(file_path)
+        if cached is None or cached[0] != mtime:
+            with open(file_path, 'rb') as file:
+                data = json_loads(file.read())
+            cached = (mtime, data, list(data.values()))
+            RequestHandler._stats_cache[file_path] = cached
+        return cached
 
-        with open(OffloadingDataFiles.data_file_path_edge, 'r') as file:
-            edge_inference_times = json.load(file)
-            edge_inference_times = list({k: v for k, v in edge_inference_times.items()}.values())
+    @staticmethod
+    def _read_stats(file_path) -> dict:
+        """ Parsed content of a stats JSON file """
+        return RequestHandler._cached_stats(file_path)[1]
 
-        with open(OffloadingDataFiles.data_file_path_sizes, 'r') as file:
-            layers_sizes = json.load(file)
-            layers_sizes = list({k: v for k, v in layers_sizes.items()}.values())
+    @staticmethod
+    def _load_stats():
+        """ Loads the offloading stats from the JSON files """
+        # the value lists are built once per change of each file
+        device_inference_times = RequestHandler._cached_stats(OffloadingDataFiles.data_file_path_device)[2]
+        edge_inference_times = RequestHandler._cached_stats(OffloadingDataFiles.data_file_path_edge)[2]
+        layers_sizes = RequestHandler._cached_stats(OffloadingDataFiles.data_file_path_sizes)[2]
         
         return device_inference_times, edge_inference_times, layers_sizes
 
     @staticmethod
     def _from_raw(topic: str, payload: bytes):
         """Parse the raw message payload into a MessageData instance."""
-        try:
-            message_data = {}
-            message_content = {}
-
-            # decode the payload from bytes to values and parse as JSON
-            message_data["timestamp"] = struct.unpack('d', payload[:8])[0]
-            offset = 8
-            message_data["device_id"] = payload[offset:offset+9].decode()
-            offset += 9
-            message_data["message_id"] = payload[offset:offset+4].decode()
-            offset += 4
-            message_content["offloading_layer_index"] = struct.unpack('i', payload[offset:offset+4])[0]
-            offset += 4
-            layer_output_size = struct.unpack('I', payload[offset:offset+4])[0]
-            offset += 4
-            message_content["layer_output"] = struct.unpack(f'<{int(layer_output_size/4)}f', payload[offset:offset+layer_output_size])
-            offset += layer_output_size
-            layers_inference_time_size = struct.unpack('i', payload[offset:offset+4])[0]
-            offset += 4
-            message_content["layers_inference_time"] = struct.unpack(f'<{int(layers_inference_time_size/4)}f', payload[offset:offset+layers_inference_time_size])
-            message_data["message_content"] = message_content
+        # decode the payload from bytes to values
+        timestamp, device_id, message_id, offloading_layer_index, layer_output_size = _RESULT_HEADER.unpack_from(payload)
+        offset = _RESULT_HEADER.size
+        message_content = {"offloading_layer_index": offloading_layer_index}
+        # float arrays are read as zero-copy views over the payload bytes
+        message_content["layer_output"] = np.frombuffer(payload, dtype='<f4', count=layer_output_size // 4, offset=offset)
+        offset += layer_output_size
+        layers_inference_time_size, = _RESULT_TIMES_SIZE.unpack_from(payload, offset)
+        offset += _RESULT_TIMES_SIZE.size
+        message_content["layers_inference_time"] = np.frombuffer(payload, dtype='<f4', count=layers_inference_time_size // 4, offset=offset)
 
-            decoded_payload = json.dumps(message_data)
-
-            message_content = message_data["message_content"]
-            # return an instance of MessageData with extracted fields
-            return MessageData(
-                topic=topic,
-                payload=decoded_payload,
-                device_id=message_data["device_id"],
-                message_id=message_data["message_id"],
-                message_content=message_content,
-                timestamp=message_data["timestamp"],
-            )
-        except json.JSONDecodeError:
-            # handles payload that cannot be parsed as JSON
-            raise
+        # return an instance of MessageData with extracted fields; the raw payload is not kept,
+        # only its size is needed (taken from the raw bytes in _extend_message_data).
+        # An empty str leaves the payload column of the evaluation CSV empty
+        return MessageData(
+            topic=topic,
+            payload="",
+            device_id=device_id.decode(),
+            message_id=message_id.decode(),
+            message_content=message_content,
+            timestamp=timestamp,
+        )
 
     @staticmethod
     def _extend_message_data(message_data: MessageData, received_timestamp: float, payload) -> MessageData:
@@ -1,12 +1,17 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 
 from server.communication.request_handler import RequestHandler
-import ntplib
-import threading
-import time
+from server.communication.ntp_clock import get_clock
 import json
 from server.logger.log import logger
 
+# Try to import orjson for faster message parsing
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 
 class WebsocketServer:
     def __init__(
@@ -33,28 +38,11 @@ class WebsocketServer:
         # Set up request handler
         self.request_handler = request_handler
 
-        # Set up NTP client
-        self.ntp_client = ntplib.NTPClient()
-        self.ntp_server = ntp_server
-        self.offset = self._sync_with_ntp()
-        self.start_timestamp = self._get_current_time()
+        # NTP clock shared with the other servers syncing to the same NTP server
+        self.clock = get_clock(ntp_server)
+        self.start_timestamp = self.clock.now()
         self._setup_routes()
 
-    def _sync_with_ntp(self) -> float:
-        ntp_timestamp = None
-        while ntp_timestamp is None:
-            try:
-                response = self.ntp_client.request(self.ntp_server)
-                # Get the offset between local clock time and ntp server time (seconds since 1900)
-                offset = response.offset
-                return offset
-            except ntplib.NTPException as _:
-                continue
-        threading.Timer(600, self.sync_with_ntp).start()
-
-    def _get_current_time(self) -> float:
-        return time.time() + self.offset
-
     def _setup_routes(self):
         @self.app.websocket(self.endpoint)
         async def websocket_endpoint(websocket: WebSocket):
@@ -64,11 +52,13 @@ class WebsocketServer:
             try:
                 while True:
                     message = await websocket.receive()  # Receives both text and binary
-                    received_timestamp = self._get_current_time()
+                    received_timestamp = self.clock.now()
+                    if message['type'] == 'websocket.disconnect':
+                        raise WebSocketDisconnect(message.get('code', 1000))
 
-                    if 'text' in message:  # JSON/Text message
+                    if message.get('text') is not None:  # JSON/Text message
                         try:
-                            json_data = json.loads(message['text'])  # Parse JSON
+                            json_data = json_loads(message['text'])  # Parse JSON (orjson raises a JSONDecodeError subclass)
                             logger.debug('Registration request received')
                             cleaned_device_id = self.request_handler.handle_registration(json_data["device_id"])
                             response = {'channel': 'registration', 'device': cleaned_device_id}
@@ -77,7 +67,7 @@ class WebsocketServer:
                         except json.JSONDecodeError:
                             logger.debug('Error: Received non-JSON text data')
 
-                    elif 'bytes' in message:  # Binary message
+                    elif message.get('bytes') is not None:  # Binary message, used as is (no UTF-8 decode)
                         binary_data = message['bytes']
                         if len(binary_data) == 18432:
                             logger.debug('Device input received')
@@ -27,6 +27,8 @@ def load_delay_config():
 class Edge:
     # Class-level variance detector (shared across edge inference calls)
     variance_detector = VarianceDetector(window_size=10, variance_threshold=0.15)
+    # Model manager kept across requests, so the model and its TFLite interpreters are loaded only once
+    _model_manager = None
     
     @staticmethod
     def run_inference(offloading_layer_index: int, offloading_layer_output: np.array):
@@ -38,14 +40,15 @@ class Edge:
         with open(OffloadingDataFiles.data_file_path_edge, 'r') as file:
             edge_inference_times = json.load(file)
 
-        # load delay configuration
-        delay_config = load_delay_config()
-
-        # load the model and make predictions
-        model_manager = ModelManager(inference_times=edge_inference_times, 
-                                     computation_delay_config=delay_config,
-                                     variance_detector=Edge.variance_detector)
-        model_manager.load_model()
+        # load the model on the first request and reuse it afterwards
+        if Edge._model_manager is None or Edge._model_manager.model is None:
+            model_manager = ModelManager(inference_times=edge_inference_times,
+                                         computation_delay_config=load_delay_config(),
+                                         variance_detector=Edge.variance_detector)
+            model_manager.load_model()
+            Edge._model_manager = model_manager
+        model_manager = Edge._model_manager
+        model_manager.inference_times = edge_inference_times
 
         # set the layers to use
         predictions = {}
@@ -102,8 +105,9 @@ class Edge:
         # load delay configuration
         delay_config = load_delay_config()
 
-        # load the model and make predictions
-        model_manager = ModelManager(computation_delay_config=delay_config,
+        # load the model and make predictions (times start empty, also when called again as reset)
+        model_manager = ModelManager(inference_times={},
+                                     computation_delay_config=delay_config,
                                      variance_detector=Edge.variance_detector)
         model_manager.load_model()
 
@@ -151,6 +155,9 @@ class Edge:
         with open(OffloadingDataFiles.data_file_path_sizes, "w") as f:
             json.dump(layer_sizes, f, indent=4)
 
+        # requests reuse this model manager, so they run with the delay configuration just loaded
+        Edge._model_manager = model_manager
+
     reset = initialization
 
 
@@ -1,4 +1,3 @@
-import struct
 import numpy as np
 from tensorflow.keras.preprocessing.image import load_img, img_to_array
 
@@ -12,20 +11,12 @@ class ModelInputConverter:
 
     @staticmethod
     def convert_rgb565_to_nparray(rgb565_image, height, width):
-        image_array = []
+        # big-endian RGB565 pixels, read in place from the request body (bytes, bytearray or memoryview)
+        pixels = np.frombuffer(rgb565_image, dtype='>u2', count=height * width).reshape(height, width)
 
-        for i in range(height):
-            row = []
-            s = rgb565_image[i * width * 2:(i + 1) * width * 2]
-            pixels = struct.unpack(f'>{width}H', s)
-            for p in pixels:
-                r = p >> 11
-                g = (p >> 5) & 0x3f
-                b = p & 0x1f
-                r = (r * 255) / 31.0
-                g = (g * 255) / 63.0
-                b = (b * 255) / 31.0
-                row.append([int(round(x)) for x in [r, g, b]])
-            image_array.append(row)
-
-        return np.array(image_array, dtype=np.uint8)
\ No newline at end of file
+        # scale each channel to 0-255 as round(c * 255 / max) did per pixel
+        image_array = np.empty((height, width, 3), dtype=np.uint8)
+        image_array[..., 0] = np.rint((pixels >> 11) * 255 / 31.0)
+        image_array[..., 1] = np.rint(((pixels >> 5) & 0x3f) * 255 / 63.0)
+        image_array[..., 2] = np.rint((pixels & 0x1f) * 255 / 31.0)
+        return image_array
@@ -2,6 +2,7 @@ import json
 import time
 from functools import wraps
 
+import numpy as np
 import tensorflow as tf
 
 from server.commons import OffloadingDataFiles
@@ -162,7 +163,8 @@ class ModelManager:
         if layer_key not in self._interpreter_cache:
             # Initialize interpreter with layer tflite model
             interpreter = tf.lite.Interpreter(
-                model_path=f'{ModelFiles.model_save_path}/test/{ModelManagerConfig.MODEL_DIR_PATH}/layers/tflite/submodel_{layer_key}.tflite')
+                model_path=f'{ModelFiles.model_save_path}/test/{ModelManagerConfig.MODEL_DIR_PATH}/layers/tflite/submodel_{layer_key}.tflite',
+                num_threads=ModelManagerConfig.NUM_THREADS)
             interpreter.allocate_tensors()
             input_details = interpreter.get_input_details()
             output_details = interpreter.get_output_details()
@@ -179,9 +181,10 @@ class ModelManager:
             input_details = cached['input_details']
             output_details = cached['output_details']
 
-        # set input tensor
+        # set input tensor, writing straight into the interpreter's buffer (set_tensor would copy again);
+        # the cast only happens when the dtype differs
         for i, input_detail in enumerate(input_details):
-            interpreter.set_tensor(input_detail['index'], layer_input_data[i].reshape(input_detail['shape']))
+            np.copyto(interpreter.tensor(input_detail['index'])(), layer_input_data[i].reshape(input_detail['shape']))
 
         # run inference
         interpreter.invoke()
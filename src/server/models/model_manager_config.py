@@ -1,3 +1,4 @@
+import os
 from dataclasses import dataclass
 
 
@@ -8,3 +9,5 @@ class ModelManagerConfig:
     MODEL_PATH: str = f"{MODEL_DIR_PATH}/{DEFAULT_MODEL_NAME}"
     IMAGE_SIZE: int = 10
     SAVE_PATH: str = f"./"
+    # TFLite interpreter threads, capped at 4 so big.LITTLE efficiency cores do not straggle
+    NUM_THREADS: int = min(4, os.cpu_count() or 1)
@@ -1,6 +1,9 @@
 import os
+from pathlib import Path
 
+import numpy as np
 import tensorflow as tf
+from PIL import Image
 from tensorflow.keras import Input
 from tensorflow.keras import layers
 from tensorflow.keras.models import Model
@@ -15,8 +18,17 @@ def init_folders(root_folder: str) -> None:
     os.makedirs(f"{root_folder}/layers/h/", exist_ok=True)
 
 
-def to_tflite(keras_model: Model, save: bool, save_dir: str, name: str) -> bytes:
+def to_tflite(keras_model: Model, save: bool, save_dir: str, name: str, representative_data=None) -> bytes:
     converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if representative_data is not None:
+        # full-integer int8 quantization calibrated on the given input samples
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        # representative_data holds one [N, ...] array per model input
+        converter.representative_dataset = lambda: ([x[i:i + 1] for x in representative_data]
+                                                    for i in range(len(representative_data[0])))
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
     tflite_model = converter.convert()
     if save:
         with open(f"{save_dir}/{name}.tflite", 'wb') as f:
@@ -56,6 +68,51 @@ def create_h5_submodels(save_dir: str, model: Model) -> dict:
     return submodels
 
 
+def create_tflite_prefixes(save_dir: str, model: Model, stop_layers) -> dict:
+    """Export fused models running layers 0..k in a single graph, one per k in stop_layers"""
+    prefixes = {}
+    start_layer_index = 1 if isinstance(model.layers[0], layers.InputLayer) else 0
+    for k in stop_layers:
+        prefix = Model(inputs=model.input, outputs=model.layers[k + start_layer_index].output)
+        prefixes[k] = to_tflite(prefix, save=True, save_dir=save_dir, name=f"prefix_{k}")
+    return prefixes
+
+
+def create_int8_submodels(save_dir: str, model: Model, submodels: dict, images: np.ndarray) -> dict:
+    """Export int8 submodels, each calibrated on the inputs its layer receives when model runs on images"""
+    # probe every layer's input tensors (two for the residual adds) in a single forward pass
+    layer_inputs = [layer.input if isinstance(layer.input, list) else [layer.input]
+                    for layer in model.layers if not isinstance(layer, layers.InputLayer)]
+    probe = Model(inputs=model.input, outputs=[t for inputs in layer_inputs for t in inputs])
+    values = iter(probe.predict(images.astype(np.float32), verbose=0))
+
+    int8_submodels = {}
+    for layer_index, (submodel, inputs) in enumerate(zip(submodels.values(), layer_inputs)):
+        representative_data = [next(values) for _ in inputs]
+        int8_submodels[layer_index] = to_tflite(submodel, save=True, save_dir=save_dir,
+                                                name=f"submodel_{layer_index}_int8",
+                                                representative_data=representative_data)
+    return int8_submodels
+
+
+def create_uint8_input_submodel(save_dir: str, submodel: Model) -> bytes:
+    """Export the first submodel with the [0, 1] rescaling baked in, taking raw uint8 RGB pixels as input"""
+    inputs = Input(shape=submodel.input_shape[1:], dtype=tf.uint8)
+    outputs = submodel(layers.Rescaling(1.0 / 255)(inputs))
+    return to_tflite(Model(inputs=inputs, outputs=outputs), save=True, save_dir=save_dir, name="submodel_0_uint8")
+
+
+def load_calibration_images(dir_path: str, size: int) -> np.ndarray:
+    """Load the images in dir_path as a [N, size, size, 3] float32 batch scaled to [0, 1]"""
+    images = [np.asarray(Image.open(path).convert("RGB").resize((size, size)), dtype=np.float32) / 255.0
+              for path in sorted(Path(dir_path).glob("*.png"))]
+    return np.stack(images)
+
+
+# Offloading layers for which a fused prefix is exported next to the per-layer submodels
+PREFIX_STOP_LAYERS = (9, 19, 29, 39, 49, 58)
+
+
 if __name__ == "__main__":
 
     # initialize folders
@@ -75,10 +132,10 @@ if __name__ == "__main__":
 
     with open(f'{main_folder}/layers/h/layers.h', 'w') as super_header_file:
         for layer_index, item in enumerate(submodels.items()):
-            model_name, model = item
+            model_name, submodel = item
             # convert the model content to a C array format
             print(f"created [tflite] submodel for layer: {layer_index}")
-            tflite_bytes = to_tflite(model, save=True, save_dir=f"{main_folder}/layers/tflite",
+            tflite_bytes = to_tflite(submodel, save=True, save_dir=f"{main_folder}/layers/tflite",
                                      name=f"submodel_{layer_index}")
 
             # convert the model content to a C array format
@@ -97,3 +154,17 @@ if __name__ == "__main__":
             macro_definition += 'if(layer_name.equals("layer_' + str(
                 layer_index) + '"))model = tflite::GetModel(layer_' + str(layer_index) + ');\\\n'
         super_header_file.write(macro_definition)
+
+    # creates and save fused prefixes '.tflite' for the common offloading layers
+    print("creating fused prefixes ...")
+    create_tflite_prefixes(save_dir=f"{main_folder}/layers/tflite", model=model, stop_layers=PREFIX_STOP_LAYERS)
+
+    # creates and save the first submodel taking raw uint8 pixels
+    print("creating uint8 input submodel ...")
+    create_uint8_input_submodel(save_dir=f"{main_folder}/layers/tflite", submodel=next(iter(submodels.values())))
+
+    # creates and save int8 submodels '.tflite', calibrated on the prediction images
+    print("creating int8 submodels ...")
+    calibration_images = load_calibration_images(f"{main_folder}/pred_data", size=model.input_shape[1])
+    create_int8_submodels(save_dir=f"{main_folder}/layers/tflite", model=model, submodels=submodels,
+                          images=calibration_images)
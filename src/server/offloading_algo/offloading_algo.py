@@ -1,5 +1,52 @@
+import numpy as np
+
 from server.logger.log import logger
 
+# Try to import numba to fuse the split-point scan into one compiled pass
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _best_split(device_costs, edge_costs, layer_data_sizes, avg_speed):
+    """Return (layer, evaluation) of the cheapest split among the first len(layer_data_sizes) layers"""
+    n = edge_costs.size
+    edge_suffix = np.zeros(n + 1)
+    for k in range(n - 1, -1, -1):
+        edge_suffix[k] = edge_suffix[k + 1] + edge_costs[k]
+    best_layer = 0
+    lowest_evaluation = np.inf
+    initial_cost = 0.0
+    for layer in range(layer_data_sizes.size):
+        initial_cost += device_costs[layer]
+        evaluation = initial_cost + layer_data_sizes[layer] / avg_speed + edge_suffix[layer + 1]
+        if evaluation < lowest_evaluation:
+            best_layer = layer
+            lowest_evaluation = evaluation
+    return best_layer, lowest_evaluation
+
+
+def _best_split_numpy(device_costs, edge_costs, layer_data_sizes, avg_speed):
+    """NumPy fallback for the numba kernel"""
+    layers = layer_data_sizes.size
+    # device prefix sums + transfer + edge suffix sums for every split point at once
+    initial_costs = np.cumsum(device_costs)[:layers]
+    edge_computation_costs = np.cumsum(edge_costs[::-1])[::-1][1:layers + 1]
+    evaluations = initial_costs + layer_data_sizes / avg_speed + edge_computation_costs
+    # NaN never wins, as with a strict comparison
+    evaluations[np.isnan(evaluations)] = np.inf
+    layer = int(np.argmin(evaluations))
+    return layer, evaluations[layer]
+
+
+if NUMBA_AVAILABLE:
+    best_split = njit(cache=True)(_best_split)
+    best_split(np.zeros(2), np.zeros(2), np.zeros(1), 1.0)  # Compile once up front
+else:
+    best_split = _best_split_numpy
+
 
 class OffloadingAlgo:
     def __init__(self,
@@ -63,21 +110,31 @@ class OffloadingAlgo:
              None
         """
         logger.info(f"Performing Partial Offloading:")
-        for layer in range(0, self.num_layers-1):
-            initial_cost = sum(self.inference_time_device[:layer+1])
-            edge_computation_cost = sum(self.inference_time_edge[layer+1:self.num_layers])
-            layer_data_size = self.layers_sizes[layer]
-
-            evaluation = self.evaluation(
-                initial_cost=initial_cost,
-                layer_data_size=layer_data_size,
-                avg_speed=self.avg_speed,
-                edge_computation_cost=edge_computation_cost,
-            )
-
-            if evaluation < self.lowest_evaluation:
-                self.best_offloading_layer = layer
-                self.lowest_evaluation = evaluation
+        layers = self.num_layers - 1
+        if layers <= 0:
+            return
+        if len(self.layers_sizes) < layers:
+            # Every split point needs the size of its output, as when they were indexed one by one
+            raise IndexError(f"{len(self.layers_sizes)} layer sizes for {self.num_layers} layers")
+        avg_speed = self.avg_speed if self.avg_speed != 0 else 1
+        layer, evaluation = best_split(
+            self._layer_costs(self.inference_time_device),
+            self._layer_costs(self.inference_time_edge),
+            np.asarray(self.layers_sizes[:layers], dtype=float),
+            float(avg_speed),
+        )
+        logger.info(f"Best Partial Offloading: layer {layer}, evaluation {evaluation}")
+
+        if evaluation < self.lowest_evaluation:
+            self.best_offloading_layer = int(layer)
+            self.lowest_evaluation = float(evaluation)
+
+    def _layer_costs(self, inference_times: list) -> np.ndarray:
+        """Per-layer times as an array of num_layers entries, zero-padded when fewer were measured"""
+        costs = np.zeros(self.num_layers)
+        times = np.asarray(inference_times[:self.num_layers], dtype=float)
+        costs[:times.size] = times
+        return costs
 
     def device_only_evaluation(self):
         """Perform Device Only Offloading
@@ -9,7 +9,7 @@ from pathlib import Path
 from server.statistics.statistics_visualizer import StatisticsVisualizer
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(
         description='Generate visualization plots from SCIoT statistics'
     )
@@ -26,7 +26,7 @@ def main():
         help='Directory to save plots (default: stats_dir/plots)'
     )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     visualizer = StatisticsVisualizer(
         stats_dir=args.stats_dir,
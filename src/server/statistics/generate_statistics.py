@@ -37,7 +37,7 @@ def load_speeds_from_csv(csv_file: str) -> list:
     return []
 
 
-def main():
+def main(argv=None):
     """Main function to generate statistics"""
     parser = argparse.ArgumentParser(
         description='Generate comprehensive statistics for SCIoT system'
@@ -69,7 +69,7 @@ def main():
         help='Output directory for statistics files'
     )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Initialize collector
     collector = StatisticsCollector(output_dir=args.output_dir)
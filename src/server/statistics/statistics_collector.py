@@ -131,11 +131,15 @@ class StatisticsCollector:
             List of dictionaries with offloading metrics
         """
         metrics = []
+        # Loop invariants, computed once instead of per layer
+        edge_values = list(edge_times.values())
+        avg_speed = stat_module.mean(avg_speeds) if avg_speeds else 1
+        device_cost = 0
         
-        for layer_idx in range(len(device_times)):
-            device_cost = sum(list(device_times.values())[:layer_idx + 1])
-            edge_cost = sum(list(edge_times.values())[layer_idx + 1:])
-            transmission_cost = layer_sizes.get(str(layer_idx), 0) / (stat_module.mean(avg_speeds) if avg_speeds else 1)
+        for layer_idx, device_time in enumerate(device_times.values()):
+            device_cost += device_time
+            edge_cost = sum(edge_values[layer_idx + 1:])
+            transmission_cost = layer_sizes.get(str(layer_idx), 0) / avg_speed
             
             total_latency = device_cost + transmission_cost + edge_cost
             
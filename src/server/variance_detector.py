@@ -137,6 +137,15 @@ class VarianceDetector:
         self.device_variance_layers: set = set()  # Layers with detected variance
         self.edge_variance_layers: set = set()    # Layers with detected variance
     
+    def reset(self):
+        """Forget all tracked measurements and pending re-test flags"""
+        self.device_histories.clear()
+        self.edge_histories.clear()
+        self.device_needs_retest = False
+        self.edge_needs_retest = False
+        self.device_variance_layers.clear()
+        self.edge_variance_layers.clear()
+    
     def add_device_measurement(self, layer_id: int, time: float) -> bool:
         """
         Add device inference time measurement.
@@ -1,6 +1,9 @@
+import random
+
 import pytest
 from pytest import mark
 
+from server.offloading_algo import offloading_algo
 from server.offloading_algo.offloading_algo import OffloadingAlgo
 
 
@@ -36,5 +39,64 @@ def test_offloading_algo(
     assert best_offloading_layer <= expected_offloading_layer_index
 
 
+def reference_offloading(avg_speed, num_layers, layers_sizes, inference_time_device, inference_time_edge):
+    """Plain-Python static offloading, evaluating every split point one by one"""
+    speed = avg_speed if avg_speed != 0 else 1
+    best_layer, lowest_evaluation = 0, float('inf')
+    for layer in range(num_layers - 1):
+        evaluation = (sum(inference_time_device[:layer + 1]) + layers_sizes[layer] / speed
+                      + sum(inference_time_edge[layer + 1:num_layers]))
+        if evaluation < lowest_evaluation:
+            best_layer, lowest_evaluation = layer, evaluation
+    evaluation = sum(inference_time_device[:num_layers]) + layers_sizes[num_layers - 1] / speed
+    if evaluation < lowest_evaluation:
+        best_layer = num_layers - 1
+    return best_layer
+
+
+# the numba kernel (or its fallback when numba is missing), the NumPy fallback and the uncompiled kernel
+SPLIT_IMPLEMENTATIONS = {
+    'default': offloading_algo.best_split,
+    'numpy': offloading_algo._best_split_numpy,
+    'python': offloading_algo._best_split,
+}
+
+
+@mark.parametrize("implementation", list(SPLIT_IMPLEMENTATIONS))
+@mark.parametrize("seed", range(25))
+def test_offloading_algo_matches_reference(implementation, seed, monkeypatch):
+    monkeypatch.setattr(offloading_algo, 'best_split', SPLIT_IMPLEMENTATIONS[implementation])
+    rng = random.Random(seed)
+    num_layers = rng.randint(1, 60)
+    layers_sizes = [rng.randint(1, 200_000) for _ in range(num_layers)]
+    # fewer measured times than layers count as 0 for the missing ones
+    inference_time_device = [rng.uniform(0, 0.01) for _ in range(rng.randint(0, num_layers))]
+    inference_time_edge = [rng.uniform(0, 0.005) for _ in range(rng.randint(0, num_layers))]
+    avg_speed = rng.choice([0, rng.uniform(1e3, 1e8)])
+
+    offloading_algo_instance = OffloadingAlgo(
+        avg_speed=avg_speed,
+        num_layers=num_layers,
+        layers_sizes=layers_sizes,
+        inference_time_device=inference_time_device,
+        inference_time_edge=inference_time_edge
+    )
+    assert offloading_algo_instance.static_offloading() == reference_offloading(
+        avg_speed, num_layers, layers_sizes, inference_time_device, inference_time_edge)
+
+
+def test_offloading_algo_short_layers_sizes():
+    offloading_algo_instance = OffloadingAlgo(
+        avg_speed=1e6,
+        num_layers=10,
+        layers_sizes=[100] * 5,
+        inference_time_device=[0.001] * 10,
+        inference_time_edge=[0.001] * 10
+    )
+    # the split points alone must not silently skip the layers without a size
+    with pytest.raises(IndexError):
+        offloading_algo_instance.mixed_computation_evaluation()
+
+
 if __name__ == "__main__":
     pytest.main()
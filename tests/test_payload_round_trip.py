@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Round-trip tests for the binary payloads exchanged by the clients and the server:
+inference results and RGB565 input images.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+import client
+from server.communication.request_handler import RequestHandler
+from server.models.model_input_converter import ModelInputConverter
+
+
+class TestInferenceResultRoundTrip:
+    """Results packed by client.py are parsed back by RequestHandler._from_raw"""
+
+    def _send(self, output_data, inference_times, offloading_layer_index):
+        with patch.object(client, "_SESSION") as session, \
+                patch.object(client, "best_offloading_layer_index", offloading_layer_index):
+            client.post_inference_result(output_data, inference_times)
+        return bytes(session.post.call_args.kwargs["data"])
+
+    @pytest.mark.parametrize("output_size, num_times, offloading_layer_index", [
+        (1, 1, 0),
+        (1000, 10, 9),
+        (4608, 59, 58),
+        (7, 0, -1),
+    ])
+    def test_round_trip(self, output_size, num_times, offloading_layer_index):
+        rng = np.random.default_rng(output_size)
+        output_data = rng.standard_normal(output_size).astype(np.float32)
+        inference_times = rng.uniform(0, 0.01, num_times).tolist()
+
+        payload = self._send(output_data, inference_times, offloading_layer_index)
+        message_data = RequestHandler._from_raw("device_inference_result", payload)
+        message_data = RequestHandler._extend_message_data(message_data, 0.0, payload)
+
+        assert message_data.device_id == client.DEVICE_ID.ljust(9, "\x00")
+        assert len(message_data.message_id) == 4
+        assert message_data.offloading_layer_index == offloading_layer_index
+        assert message_data.payload_size == len(payload)
+        assert message_data.payload == ""  # written as an empty CSV field
+        np.testing.assert_array_equal(message_data.layer_output, output_data)
+        np.testing.assert_array_equal(message_data.device_layers_inference_time,
+                                      np.asarray(inference_times, dtype=np.float32))
+
+    def test_multidimensional_output(self):
+        output_data = np.arange(2 * 3 * 4, dtype=np.float32).reshape(1, 2, 3, 4)
+
+        payload = self._send(output_data, [0.5], 3)
+        message_data = RequestHandler._from_raw("device_inference_result", payload)
+
+        np.testing.assert_array_equal(message_data.message_content["layer_output"], output_data.ravel())
+
+
+@pytest.fixture(scope="module")
+def http_client():
+    """server_client_light/client/http_client.py, imported from its path (a script, not a package module)"""
+    client_dir = Path(__file__).resolve().parent.parent / "server_client_light" / "client"
+    sys.path.insert(0, str(client_dir))
+    try:
+        spec = importlib.util.spec_from_file_location("http_client", client_dir / "http_client.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(str(client_dir))
+    return module
+
+
+class TestRgb565RoundTrip:
+    """Images packed by the HTTP client are decoded back by ModelInputConverter"""
+
+    @pytest.mark.parametrize("height, width", [(96, 96), (1, 1), (3, 5)])
+    def test_round_trip(self, http_client, height, width):
+        rng = np.random.default_rng(height * width)
+        image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+        rgb565 = http_client.rgb888_to_rgb565(image)
+        decoded = ModelInputConverter.convert_rgb565_to_nparray(rgb565, height, width)
+
+        # only the top 5/6/5 bits survive, scaled back to 0-255
+        channels = image.astype(int)
+        expected = np.stack([
+            np.rint((channels[..., 0] >> 3) * 255 / 31.0),
+            np.rint((channels[..., 1] >> 2) * 255 / 63.0),
+            np.rint((channels[..., 2] >> 3) * 255 / 31.0),
+        ], axis=-1).astype(np.uint8)
+        assert len(rgb565) == height * width * 2
+        np.testing.assert_array_equal(decoded, expected)
+
+    def test_all_pixel_values(self, http_client):
+        # every RGB565 value decodes to channels that pack back to the same value
+        values = np.arange(65536, dtype=">u2").tobytes()
+        decoded = ModelInputConverter.convert_rgb565_to_nparray(values, 256, 256)
+
+        assert http_client.rgb888_to_rgb565(decoded) == values
@@ -153,6 +153,20 @@ class TestVarianceDetector:
         stability = detector.get_layer_stability(0)
         assert stability['device_stable'] is True
         assert stability['edge_stable'] is True
+    
+    def test_reset(self):
+        """Test reset forgets histories and pending re-test flags"""
+        detector = VarianceDetector()
+        
+        for i in range(10):
+            detector.add_device_measurement(0, 19e-6 * (1 + i * 0.10))
+            detector.add_edge_measurement(0, 450e-6 * (1 + i * 0.10))
+        detector.reset()
+        
+        assert len(detector.device_histories) == 0
+        assert len(detector.edge_histories) == 0
+        assert detector.should_retest_offloading() is False
+        assert detector.get_layers_needing_retest() == {'device': [], 'edge': []}
 
 
 class TestVarianceCascading: